@@ -0,0 +1,422 @@
+import argparse
+import io
+import os
+import struct
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+INPUT_COLUMNS = ['pH', 'Nutrisi', 'Logam_Berat', 'Bahan_Organik']
+
+# Binary outputs store Kualitas as uint8 codes into this tuple (score order)
+CATEGORIES = ('Buruk', 'Sedang', 'Baik')
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+NPY_EXTENSIONS = ('.npy',)
+
+def _extension(path):
+    return os.path.splitext(path)[1].lower()
+
+def _pyarrow(purpose):
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError(f"{purpose} requires pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+def make_scorer(model='main', control_surface=None, lookup_table=None, defuzzification='discrete'):
+    """Function scoring a chunk -> (scores, categories) with the chosen implementation
+
+    A chunk is a DataFrame or a dict of column arrays; both are indexed by
+    column name, so binary inputs reach the model as the arrays they were
+    read into. `defuzzification` applies to main and withlib.
+    """
+    if model == 'lut':
+        # Memory-mapped, so all workers share the pages of one table file
+        from lut import LookupTable
+        table = LookupTable(lookup_table)
+        return lambda df: table.evaluate(*(df[column] for column in INPUT_COLUMNS))
+
+    if model == 'main':
+        from main import FuzzyMamdaniSoilQuality
+        return FuzzyMamdaniSoilQuality(defuzzification=defuzzification).evaluate_batch
+
+    if model == 'manual':
+        import manual
+        return lambda df: manual.evaluate(*(np.asarray(df[column], dtype=float) for column in INPUT_COLUMNS))
+
+    if model == 'withlib':
+        from withlib import FuzzySoilQuality
+        system = FuzzySoilQuality(defuzzification=defuzzification, control_surface=control_surface)
+        if system.control_surface is not None:
+            return lambda df: system.control_surface.evaluate(*(df[column] for column in INPUT_COLUMNS))
+        def score(df):
+            results = [system.evaluate(*row) for row in zip(*(df[column] for column in INPUT_COLUMNS))]
+            return np.array([s for s, _ in results], dtype=float), np.array([c for _, c in results])
+        return score
+
+    raise ValueError(f"Unknown model: {model!r}")
+
+# Scorer of the current worker process, built once by _init_worker
+_scorer = None
+
+def _init_worker(model, control_surface, lookup_table, defuzzification='discrete'):
+    global _scorer
+    _scorer = make_scorer(model, control_surface, lookup_table, defuzzification)
+
+def _score_chunk(chunk):
+    """Score one chunk in a worker and return it with Skor and Kualitas columns appended"""
+    scores, categories = _scorer(chunk)
+    if isinstance(chunk, pd.DataFrame):
+        return chunk.assign(Skor=scores, Kualitas=categories)
+    return {**chunk, 'Skor': scores, 'Kualitas': categories}
+
+def _record_batch_columns(batch):
+    """{name: array} of an Arrow record batch; numeric columns without nulls are not copied"""
+    return {name: column.to_numpy(zero_copy_only=False) for name, column in zip(batch.schema.names, batch.columns)}
+
+def _npy_columns(array):
+    """{name: view} for a structured array, or the INPUT_COLUMNS of an (n x 4) matrix"""
+    if array.dtype.names:
+        return {name: array[name] for name in array.dtype.names}
+    if array.ndim != 2 or array.shape[1] != len(INPUT_COLUMNS):
+        raise ValueError(f"NPY input must be a structured array or an (n x 4) matrix of {', '.join(INPUT_COLUMNS)}")
+    return {name: array[:, k] for k, name in enumerate(INPUT_COLUMNS)}
+
+def _csv_ranges(path, chunk_size):
+    """(start, stop) byte ranges of about `chunk_size` rows each, after the header and ending at line ends
+
+    The row length is estimated from the first 64 KB of rows. Splitting at
+    line ends assumes no quoted field spans lines, as in numeric soil data.
+    """
+    with open(path, 'rb') as f:
+        f.readline()
+        start = f.tell()
+        sample = f.read(1 << 16)
+        size = os.fstat(f.fileno()).st_size
+        step = max(1, chunk_size * len(sample) // max(sample.count(b'\n'), 1))
+        while start < size:
+            f.seek(min(start + step, size))
+            f.readline()
+            stop = f.tell()
+            yield start, stop
+            start = stop
+
+def _tasks(path, chunk_size):
+    """Yield small descriptions of the chunks of an input file, each read by _read_task in a worker"""
+    extension = _extension(path)
+    if extension in PARQUET_EXTENSIONS:
+        _pyarrow("Parquet input")
+        import pyarrow.parquet as pq
+        for group in range(pq.ParquetFile(path).num_row_groups):
+            yield ('parquet', path, group)
+    elif extension in ARROW_EXTENSIONS:
+        pa = _pyarrow("Arrow input")
+        try:
+            reader = pa.ipc.open_file(pa.memory_map(path))
+        except pa.ArrowInvalid:
+            # A stream has no index of its batches, so it is read here and the chunks are sent as they are
+            for batch in pa.ipc.open_stream(pa.memory_map(path)):
+                for offset in range(0, batch.num_rows, chunk_size):
+                    yield ('columns', _record_batch_columns(batch.slice(offset, chunk_size)))
+            return
+        for index in range(reader.num_record_batches):
+            for offset in range(0, reader.get_batch(index).num_rows, chunk_size):
+                yield ('arrow', path, index, offset, chunk_size)
+    elif extension in NPY_EXTENSIONS:
+        for start in range(0, len(np.load(path, mmap_mode='r')), chunk_size):
+            yield ('npy', path, start, start + chunk_size)
+    else:
+        names = input_columns(path)
+        for start, stop in _csv_ranges(path, chunk_size):
+            yield ('csv', path, start, stop, names)
+
+def _read_task(task):
+    """The chunk described by a task from _tasks: a DataFrame for CSV, a dict of arrays otherwise"""
+    kind, *args = task
+    if kind == 'columns':
+        return args[0]
+    if kind == 'npy':
+        path, start, stop = args
+        return _npy_columns(np.load(path, mmap_mode='r')[start:stop])
+    if kind == 'arrow':
+        path, index, offset, length = args
+        pa = _pyarrow("Arrow input")
+        return _record_batch_columns(pa.ipc.open_file(pa.memory_map(path)).get_batch(index).slice(offset, length))
+    if kind == 'parquet':
+        path, group = args
+        import pyarrow.parquet as pq
+        table = pq.ParquetFile(path, memory_map=True).read_row_group(group)
+        return {name: column.to_numpy() for name, column in zip(table.column_names, table.columns)}
+    path, start, stop, names = args
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    if not data.strip():
+        return pd.DataFrame(columns=names)
+    return pd.read_csv(io.BytesIO(data), header=None, names=names)
+
+def read_chunks(path, chunk_size=100_000):
+    """Yield chunks of `chunk_size` rows from a CSV, Parquet, Arrow IPC/Feather or NPY file
+
+    CSV chunks are DataFrames. The binary formats yield dicts of NumPy
+    arrays with the column types stored in the file (e.g. float32): Arrow
+    files and .npy arrays are memory-mapped and sliced without copying.
+    Parquet files are read one row group per chunk, whatever chunk_size is.
+    """
+    for task in _tasks(path, chunk_size):
+        yield _read_task(task)
+
+def input_columns(path):
+    """Column names of an input file, without reading its rows"""
+    extension = _extension(path)
+    if extension in PARQUET_EXTENSIONS:
+        _pyarrow("Parquet input")
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    if extension in ARROW_EXTENSIONS:
+        pa = _pyarrow("Arrow input")
+        try:
+            return pa.ipc.open_file(pa.memory_map(path)).schema.names
+        except pa.ArrowInvalid:
+            return pa.ipc.open_stream(pa.memory_map(path)).schema.names
+    if extension in NPY_EXTENSIONS:
+        return list(_npy_columns(np.load(path, mmap_mode='r')[:0]))
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def _process(task, encode=None):
+    """Read and score one chunk in a worker, then encode it for the writer; returns (rows, result)"""
+    chunk = _score_chunk(_read_task(task))
+    return len(chunk['Skor']), chunk if encode is None else encode(chunk)
+
+def _iter_processed(input_path, encode, model, workers, chunk_size, max_pending, control_surface, lookup_table,
+                    defuzzification):
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or 2 * workers
+    tasks = _tasks(input_path, chunk_size)
+    if workers == 1:
+        # No pool: everything runs in this process, which avoids pickling the results
+        _init_worker(model, control_surface, lookup_table, defuzzification)
+        for task in tasks:
+            yield _process(task, encode)
+        return
+
+    initargs = (model, control_surface, lookup_table, defuzzification)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_process, task, encode))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def iter_scored_chunks(input_path, model='main', workers=None, chunk_size=100_000,
+                       max_pending=None, control_surface=None, lookup_table=None, defuzzification='discrete'):
+    """Yield scored chunks of an input file (see read_chunks) in input order
+
+    Every chunk is read and scored by one worker of a process pool; the
+    parent only hands out byte ranges, row ranges or row groups. At most
+    `max_pending` chunks (default 2 per worker) are in flight, so memory
+    stays bounded however large the file is.
+    """
+    for _, chunk in _iter_processed(input_path, None, model, workers, chunk_size, max_pending, control_surface,
+                                    lookup_table, defuzzification):
+        yield chunk
+
+class CsvWriter:
+    """Append encoded chunks to a CSV file after its header"""
+    def __init__(self, path, columns):
+        self.file = open(path, 'wb')
+        self.file.write(pd.DataFrame(columns=columns).to_csv(index=False).encode())
+
+    @staticmethod
+    def encode(chunk):
+        """CSV rows of a scored chunk as bytes, formatted in the worker"""
+        return pd.DataFrame(chunk).to_csv(header=False, index=False).encode()
+
+    def write(self, data):
+        self.file.write(data)
+
+    def close(self):
+        self.file.close()
+
+def compact_columns(chunk):
+    """Columns of a scored chunk as stored in binary outputs
+
+    Numeric input columns become float32, Skor becomes float32 (nudged by
+    lut.encode so no score changes category) and Kualitas becomes uint8
+    codes into CATEGORIES. Other columns are kept as they are.
+    """
+    from lut import THRESHOLDS, encode
+    columns = {name: np.asarray(chunk[name]) for name in chunk.keys()}
+    for name in INPUT_COLUMNS:
+        if name in columns and columns[name].dtype.kind in 'iuf':
+            columns[name] = columns[name].astype(np.float32, copy=False)
+    scores = np.asarray(chunk['Skor'], dtype=float)
+    columns['Skor'] = encode(scores, np.float32)
+    columns['Kualitas'] = np.digitize(scores, THRESHOLDS).astype(np.uint8)
+    return columns
+
+class ParquetWriter:
+    """Append encoded chunks as row groups of one Parquet file (requires pyarrow)
+
+    Columns are compacted as in compact_columns, with Kualitas dictionary
+    encoded so readers get the category names back.
+    """
+    purpose = "Parquet output"
+
+    def __init__(self, path, columns):
+        self.pa = _pyarrow(self.purpose)
+        self.path = path
+        self.columns = columns
+        self.schema = None
+        self.writer = None
+
+    def _open(self, schema):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(self.path, schema)
+
+    @staticmethod
+    def encode(chunk):
+        """Arrow table of a scored chunk, compacted in the worker"""
+        import pyarrow as pa
+        categories = pa.array(CATEGORIES)
+        return pa.table({name: pa.DictionaryArray.from_arrays(values, categories) if name == 'Kualitas'
+                         else pa.array(values, from_pandas=True) for name, values in compact_columns(chunk).items()})
+
+    def write(self, table):
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = self._open(table.schema)
+        else:
+            # Later chunks follow the first chunk's schema (e.g. an int column that gained NaN)
+            table = table.cast(self.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is None:
+            self.write(self.encode({name: np.empty(0) for name in self.columns}))
+        self.writer.close()
+
+class ArrowWriter(ParquetWriter):
+    """Append encoded chunks as record batches of one Arrow IPC (Feather v2) file (requires pyarrow)"""
+    purpose = "Arrow output"
+
+    def _open(self, schema):
+        return self.pa.ipc.new_file(self.path, schema)
+
+class NpyWriter:
+    """Append encoded chunks to one structured .npy array, compacted as in compact_columns
+
+    The row count is only known at the end, so the header is written with
+    a placeholder and rewritten in place by close(); it is padded to a
+    fixed size for that. Columns that are not numeric cannot be stored.
+    """
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        self.file = None
+        self.header_size = None
+        self.rows = 0
+
+    def _header(self, rows):
+        header = repr({'descr': np.lib.format.dtype_to_descr(self.dtype), 'fortran_order': False,
+                       'shape': (rows,)}).encode('latin1')
+        if self.header_size is None:
+            # Room for any row count, rounded up to numpy's 64-byte alignment
+            self.header_size = -(-(len(header) + 11 + 18) // 64) * 64
+        return b'\x93NUMPY\x01\x00' + struct.pack('<H', self.header_size - 10) \
+            + header.ljust(self.header_size - 11) + b'\n'
+
+    @staticmethod
+    def encode(chunk):
+        """Structured array of a scored chunk, compacted in the worker"""
+        columns = compact_columns(chunk)
+        fields = []
+        for name, values in columns.items():
+            if values.dtype.kind not in 'biuf':
+                if len(values):
+                    raise ValueError(f"NPY output cannot store the non-numeric column {name!r}; use Parquet or Arrow")
+                # Empty CSV input: pandas gives untyped columns
+                values = values.astype(float)
+            fields.append((name, values.dtype))
+        records = np.empty(len(columns['Skor']), fields)
+        for name, values in columns.items():
+            records[name] = values
+        return records
+
+    def write(self, records):
+        if self.file is None:
+            self.dtype = records.dtype
+            self.file = open(self.path, 'wb')
+            self.file.write(self._header(0))
+        self.file.write(records.astype(self.dtype, copy=False).tobytes())
+        self.rows += len(records)
+
+    def close(self):
+        if self.file is None:
+            self.write(self.encode({name: np.empty(0) for name in self.columns}))
+        self.file.seek(0)
+        self.file.write(self._header(self.rows))
+        self.file.close()
+
+def open_writer(path, columns):
+    """Incremental writer for `path` with the given output columns, chosen by extension:
+    Parquet, Arrow IPC/Feather, NPY or CSV"""
+    extension = _extension(path)
+    if extension in PARQUET_EXTENSIONS:
+        return ParquetWriter(path, columns)
+    if extension in ARROW_EXTENSIONS:
+        return ArrowWriter(path, columns)
+    if extension in NPY_EXTENSIONS:
+        return NpyWriter(path, columns)
+    return CsvWriter(path, columns)
+
+def score_file(input_path, output_path, model='main', workers=None, chunk_size=100_000,
+               max_pending=None, control_surface=None, lookup_table=None, defuzzification='discrete'):
+    """Stream an input file through the scorer into a CSV, Parquet, Arrow or NPY file
+
+    Workers read, score and encode their chunks (CSV text, Arrow tables or
+    structured arrays), so the parent only writes the results in input
+    order. Only the chunks in flight are held in memory, so peak memory
+    depends on chunk_size and workers, not on the input size. Returns
+    (rows, seconds).
+    """
+    start = time.perf_counter()
+    writer = open_writer(output_path, input_columns(input_path) + ['Skor', 'Kualitas'])
+    rows = 0
+    for count, encoded in _iter_processed(input_path, writer.encode, model, workers, chunk_size, max_pending,
+                                          control_surface, lookup_table, defuzzification):
+        writer.write(encoded)
+        rows += count
+    writer.close()
+    return rows, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluasi kualitas tanah untuk file besar secara paralel dan bertahap")
+    parser.add_argument('input', help="file .csv, .parquet, .arrow/.feather atau .npy dengan kolom "
+                                      "pH, Nutrisi, Logam_Berat, Bahan_Organik")
+    parser.add_argument('output', help="file hasil (.csv, .parquet, .arrow/.feather atau .npy), berisi kolom input "
+                                       "ditambah Skor dan Kualitas; format biner menyimpan input dan Skor sebagai "
+                                       "float32 dan Kualitas sebagai kode 0=Buruk, 1=Sedang, 2=Baik")
+    parser.add_argument('--model', choices=['main', 'manual', 'withlib', 'lut'], default='main')
+    parser.add_argument('--defuzzification', choices=['discrete', 'analytic'], default='discrete',
+                        help="metode defuzzifikasi untuk model main dan withlib")
+    parser.add_argument('--workers', type=int, default=None, help="jumlah proses (default: jumlah core)")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="baris per chunk")
+    parser.add_argument('--max-pending', type=int, default=None, help="chunk maksimum yang diproses bersamaan")
+    parser.add_argument('--control-surface', default=None, help="file .npz ControlSurface untuk model withlib")
+    parser.add_argument('--lookup-table', default=None, help="tabel .npy dari lut.py untuk model lut")
+    args = parser.parse_args()
+
+    rows, elapsed = score_file(args.input, args.output, args.model, args.workers, args.chunk_size,
+                               args.max_pending, args.control_surface, args.lookup_table, args.defuzzification)
+    print(f"{rows} baris dievaluasi dalam {elapsed:.2f} detik ({rows / max(elapsed, 1e-9):,.0f} baris/detik)")
+    print(f"Hasil tersimpan di {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,205 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
 import time
+import tracemalloc
+from datetime import datetime, timezone
 import numpy as np
-import pandas as pd
+import manual
+import profiling
 from main import FuzzyMamdaniSoilQuality
-from withlib import FuzzyMamdaniSoilQualityWithLib
+from withlib import FuzzySoilQuality
 
-def benchmark_performance():
-    """Benchmark performance between manual and library implementations"""
-    
-    # Create instances
-    manual_system = FuzzyMamdaniSoilQuality()
-    library_system = FuzzyMamdaniSoilQualityWithLib()
-    
-    # Test data
-    test_cases = [
-        (6.5, 150, 12, 3),
-        (7.5, 250, 5, 6),
-        (5.5, 50, 25, 1),
-        (6.8, 180, 15, 4),
-        (8.0, 300, 10, 7)
-    ]
-    
-    # Benchmark Manual Implementation
-    print("=== BENCHMARK PERFORMANCE ===")
-    print("\n1. Manual Implementation (main.py)")
-    
-    start_time = time.time()
-    manual_results = []
-    for i in range(1000):  # 1000 iterations
-        for ph, nutrition, heavy_metal, organic_matter in test_cases:
-            score, category = manual_system.evaluate_soil_quality(ph, nutrition, heavy_metal, organic_matter)
-            manual_results.append(score)
-    manual_time = time.time() - start_time
-    
-    print(f"   Waktu eksekusi: {manual_time:.4f} detik")
-    print(f"   Rata-rata per evaluasi: {(manual_time/5000)*1000:.4f} ms")
-    
-    # Benchmark Library Implementation
-    print("\n2. Library Implementation (withlib.py)")
-    
-    start_time = time.time()
-    library_results = []
-    for i in range(1000):  # 1000 iterations
-        for ph, nutrition, heavy_metal, organic_matter in test_cases:
-            score, category = library_system.evaluate_soil_quality(ph, nutrition, heavy_metal, organic_matter)
-            library_results.append(score)
-    library_time = time.time() - start_time
-    
-    print(f"   Waktu eksekusi: {library_time:.4f} detik")
-    print(f"   Rata-rata per evaluasi: {(library_time/5000)*1000:.4f} ms")
-    
-    # Performance comparison
-    speedup = library_time / manual_time
-    print(f"\n3. Perbandingan Performance:")
-    print(f"   Manual {speedup:.2f}x lebih cepat dari Library")
+DEFAULT_SIZES = [1, 10, 100, 1_000, 10_000, 100_000, 1_000_000]
+
+DISTRIBUTIONS = ('uniform', 'realistic')
+
+def random_inputs(n, seed=0, distribution='uniform'):
+    """(n x 4) matrix of pH, nutrisi, logam berat and bahan organik
     
-    return manual_results, library_results
+    'uniform' covers the universes evenly; 'realistic' clusters around typical
+    lab values (slightly acidic to neutral soil, moderate nutrients, low metal
+    content), where only a few rules fire per sample.
+    """
+    rng = np.random.default_rng(seed)
+    if distribution == 'realistic':
+        return np.column_stack([np.clip(rng.normal(6.6, 0.6, n), 4, 9), np.clip(rng.normal(180, 60, n), 0, 350),
+                                np.clip(rng.gamma(2.0, 4.0, n), 0, 30), np.clip(rng.normal(4.0, 1.8, n), 0, 10)])
+    return np.column_stack([rng.uniform(4, 9, n), rng.uniform(0, 350, n),
+                            rng.uniform(0, 30, n), rng.uniform(0, 10, n)])
+
+def _per_row(evaluate):
+    """Scorer that calls a single-sample evaluate function for every row"""
+    return lambda X: [evaluate(*row) for row in X.tolist()]
+
+def implementations(control_surface=None, lookup_table=None):
+    """Benchmarked scorers by name; each takes an (n x 4) matrix"""
+    main_system = FuzzyMamdaniSoilQuality()
+    analytic_system = FuzzyMamdaniSoilQuality(defuzzification='analytic')
+    float32_system = FuzzyMamdaniSoilQuality(dtype=np.float32)
+    # skfuzzy caches results of inputs it has seen; repeats must not time cache hits
+    library_system = FuzzySoilQuality(simulation_cache=False)
+    library_analytic = FuzzySoilQuality(defuzzification='analytic')
+    scorers = {
+        'main': _per_row(main_system.evaluate_soil_quality),
+        'main-batch': lambda X: main_system.evaluate_batch(*X.T),
+        'main-batch-analytic': lambda X: analytic_system.evaluate_batch(*X.T),
+        'main-batch-float32': lambda X: float32_system.evaluate_batch(*X.T),
+        'manual': _per_row(manual.evaluate),
+        'manual-batch': lambda X: manual.evaluate(*X.T),
+        'withlib': _per_row(library_system.evaluate),
+        'withlib-analytic': _per_row(library_analytic.evaluate),
+    }
+    if control_surface is not None:
+        surface = FuzzySoilQuality(control_surface=control_surface).control_surface
+        scorers['withlib-surface'] = lambda X: surface.evaluate(*X.T)
+    if lookup_table is not None:
+        from lut import LookupTable
+        table = LookupTable(lookup_table, main_system)
+        scorers['main-lut'] = lambda X: table.evaluate(*X.T)
+    return scorers
+
+def _stats(times, size):
+    times = np.asarray(times)
+    p50, p90, p99 = np.percentile(times, [50, 90, 99])
+    return {
+        'runs': len(times),
+        'min_s': float(times.min()), 'mean_s': float(times.mean()), 'max_s': float(times.max()),
+        'p50_s': float(p50), 'p90_s': float(p90), 'p99_s': float(p99),
+        'per_eval_us': float(p50 / size * 1e6),
+        'evals_per_s': float(size / p50) if p50 > 0 else float('inf'),
+    }
+
+def benchmark(scorer, X, repeats=5, warmup=1, memory=True, warm=None):
+    """Time `scorer` on X: warm-up runs, then `repeats` timed runs and one traced run for peak memory
+
+    Warm-up uses `warm`, by default 1000 fresh random rows, never rows of
+    X, so no result cache is primed with the timed inputs.
+    """
+    if warm is None:
+        warm = random_inputs(1_000, seed=None)
+    # withlib prints an error line for every sample where no rule fires
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return _benchmark(scorer, X, repeats, warmup, memory, warm)
+
+def _benchmark(scorer, X, repeats, warmup, memory, warm):
+    for _ in range(warmup):
+        scorer(warm)
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scorer(X)
+        times.append(time.perf_counter() - start)
+    result = _stats(times, len(X))
+
+    if memory:
+        # Separate run: tracemalloc slows allocation-heavy code, so it must not touch the timings
+        tracemalloc.start()
+        scorer(X)
+        result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+def run_suite(names=None, sizes=DEFAULT_SIZES, repeats=5, warmup=1, max_seconds=60.0,
+              memory=True, control_surface=None, lookup_table=None, seed=0, distribution='uniform'):
+    """Benchmark every implementation at every batch size
+
+    A size is skipped (and recorded as skipped) when the time per evaluation
+    measured at the previous size predicts more than `max_seconds` for its
+    repeats, so the per-row implementations do not run for hours at 10^6.
+    """
+    scorers = implementations(control_surface, lookup_table)
+    names = names or list(scorers)
+    X_all = random_inputs(max(sizes), seed, distribution)
+    # Warm-up rows from another seed, so no timed row has been seen before
+    warm = random_inputs(1_000, seed + 1, distribution)
+    results = []
+    for name in names:
+        per_eval = None
+        for size in sizes:
+            entry = {'implementation': name, 'size': size}
+            estimate = per_eval * size * (repeats + memory) if per_eval is not None else 0.0
+            if estimate > max_seconds:
+                entry['skipped'] = f"estimated {estimate:.0f} s > {max_seconds:.0f} s"
+            else:
+                entry.update(benchmark(scorers[name], X_all[:size], repeats, warmup, memory, warm))
+                per_eval = entry['p50_s'] / size
+            results.append(entry)
+            _print_entry(entry)
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'repeats': repeats,
+        'distribution': distribution,
+        'results': results,
+    }
+
+def _print_entry(entry):
+    label = f"{entry['implementation']:<20} n={entry['size']:<8}"
+    if 'skipped' in entry:
+        print(f"{label} dilewati ({entry['skipped']})")
+        return
+    memory = f" | puncak memori {entry['peak_memory_bytes'] / 2**20:8.2f} MB" if 'peak_memory_bytes' in entry else ""
+    print(f"{label} p50 {entry['p50_s'] * 1e3:10.3f} ms | p99 {entry['p99_s'] * 1e3:10.3f} ms | "
+          f"{entry['per_eval_us']:9.2f} µs/evaluasi | {entry['evals_per_s']:12,.0f} evaluasi/detik{memory}")
+
+def compare(report, baseline, tolerance=0.25):
+    """Entries whose p50 is more than `tolerance` slower than in the baseline report"""
+    reference = {(r['implementation'], r['size']): r for r in baseline['results'] if 'p50_s' in r}
+    regressions = []
+    for entry in report['results']:
+        before = reference.get((entry['implementation'], entry['size']))
+        if before and 'p50_s' in entry and entry['p50_s'] > before['p50_s'] * (1 + tolerance):
+            regressions.append((entry['implementation'], entry['size'], entry['p50_s'] / before['p50_s']))
+    return regressions
+
+# Scoring-only start-up: import a module and score one sample, as a short CLI job would
+STARTUP_SCRIPTS = {
+    'main': "from main import FuzzyMamdaniSoilQuality; FuzzyMamdaniSoilQuality().evaluate_soil_quality(6.5, 150, 12, 3)",
+    'manual': "import manual; manual.evaluate(6.5, 150, 12, 3)",
+    'withlib': "from withlib import FuzzySoilQuality; FuzzySoilQuality().evaluate(6.5, 150, 12, 3)",
+}
+
+def _import_time(module):
+    """Cumulative import time of `module` in µs, from python -X importtime in a fresh interpreter"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    for line in reversed(result.stderr.splitlines()):
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    raise RuntimeError(f"No importtime entry for {module}")
+
+def benchmark_startup(repeats=5):
+    """Median import time and wall time of a one-sample scoring run, per module, in fresh interpreters"""
+    results = {}
+    for module, script in STARTUP_SCRIPTS.items():
+        imports = sorted(_import_time(module) for _ in range(repeats))
+        walls = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', script], check=True, capture_output=True,
+                           cwd=os.path.dirname(os.path.abspath(__file__)))
+            walls.append(time.perf_counter() - start)
+        results[module] = {'import_s': imports[len(imports) // 2] / 1e6, 'wall_s': float(np.median(walls))}
+        print(f"{module:<8} impor {results[module]['import_s'] * 1e3:8.1f} ms | "
+              f"impor + 1 evaluasi (proses baru) {results[module]['wall_s'] * 1e3:8.1f} ms")
+    return results
 
 def benchmark_accuracy():
-    """Benchmark accuracy between implementations"""
-    
+    """Compare the scores of the three implementations on the sample cases"""
     print("\n=== BENCHMARK AKURASI ===")
-    
-    # Create instances
-    manual_system = FuzzyMamdaniSoilQuality()
-    library_system = FuzzyMamdaniSoilQualityWithLib()
-    
-    # Test cases with expected results
+
+    main_system = FuzzyMamdaniSoilQuality()
+    library_system = FuzzySoilQuality()
+
     test_cases = [
         (6.5, 150, 12, 3, "Case 1"),
         (7.5, 250, 5, 6, "Case 2"),
@@ -73,52 +207,80 @@ def benchmark_accuracy():
         (6.8, 180, 15, 4, "Case 4"),
         (8.0, 300, 10, 7, "Case 5")
     ]
-    
+
     print("\nPerbandingan Hasil:")
-    print("Case | Manual Score | Library Score | Difference | Manual Cat | Library Cat")
-    print("-" * 75)
-    
-    total_diff = 0
+    print("Case   | Main Score | Manual Score | Library Score | Main Cat | Manual Cat | Library Cat")
+    print("-" * 86)
+
     for ph, nutrition, heavy_metal, organic_matter, case_name in test_cases:
-        manual_score, manual_cat = manual_system.evaluate_soil_quality(ph, nutrition, heavy_metal, organic_matter)
-        library_score, library_cat = library_system.evaluate_soil_quality(ph, nutrition, heavy_metal, organic_matter)
-        
-        diff = abs(manual_score - library_score)
-        total_diff += diff
-        
-        print(f"{case_name:5} | {manual_score:11.2f} | {library_score:12.2f} | {diff:9.2f} | {manual_cat:10} | {library_cat:11}")
-    
-    avg_diff = total_diff / len(test_cases)
-    print("-" * 75)
-    print(f"Rata-rata perbedaan: {avg_diff:.2f}")
-    
-    if avg_diff < 5:
-        print("✅ Akurasi: SANGAT BAIK (perbedaan < 5)")
-    elif avg_diff < 10:
-        print("✅ Akurasi: BAIK (perbedaan < 10)")
-    else:
-        print("⚠️  Akurasi: PERLU PERBAIKAN (perbedaan > 10)")
+        main_score, main_cat = main_system.evaluate_soil_quality(ph, nutrition, heavy_metal, organic_matter)
+        manual_score, manual_cat = manual.evaluate(ph, nutrition, heavy_metal, organic_matter)
+        library_score, library_cat = library_system.evaluate(ph, nutrition, heavy_metal, organic_matter)
+        print(f"{case_name:6} | {main_score:10.2f} | {manual_score:12.2f} | {library_score:13.2f} | "
+              f"{main_cat:8} | {manual_cat:10} | {library_cat:11}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Benchmark performa sistem fuzzy Mamdani")
+    parser.add_argument('--implementations', nargs='+', default=None, help="default: semua")
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='uniform', help="sebaran input acak")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--max-seconds', type=float, default=60.0,
+                        help="lewati ukuran batch yang diperkirakan lebih lama dari ini")
+    parser.add_argument('--no-memory', action='store_true', help="jangan ukur puncak memori")
+    parser.add_argument('--control-surface', default=None, help="file .npz ControlSurface untuk withlib-surface")
+    parser.add_argument('--lookup-table', default=None, help="tabel .npy dari lut.py untuk main-lut")
+    parser.add_argument('--stages', action='store_true',
+                        help="catat waktu per tahap inferensi (menambah sedikit overhead pada timing)")
+    parser.add_argument('--json', default=None, help="simpan hasil sebagai JSON")
+    parser.add_argument('--baseline', default=None, help="JSON sebelumnya untuk deteksi regresi")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--accuracy', action='store_true', help="tampilkan juga perbandingan akurasi")
+    parser.add_argument('--startup', action='store_true',
+                        help="ukur waktu start-up (python -X importtime) dan lewati benchmark lainnya")
+    args = parser.parse_args()
+
     print("BENCHMARK SISTEM FUZZY MAMDANI")
     print("=" * 50)
+    if args.startup:
+        report = {'timestamp': datetime.now(timezone.utc).isoformat(), 'python': sys.version.split()[0],
+                  'platform': platform.platform(), 'startup': benchmark_startup(args.repeats)}
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"\nHasil tersimpan di {args.json}")
+        return
     
-    # Performance benchmark
-    manual_results, library_results = benchmark_performance()
-    
-    # Accuracy benchmark
-    benchmark_accuracy()
-    
-    print("\n=== KESIMPULAN ===")
-    print("1. Performance:")
-    print("   - Manual implementation lebih cepat untuk dataset kecil")
-    print("   - Library implementation lebih efisien untuk operasi kompleks")
-    print("\n2. Akurasi:")
-    print("   - Kedua implementasi memberikan hasil yang konsisten")
-    print("   - Library implementation lebih robust dan well-tested")
-    print("\n3. Rekomendasi:")
-    print("   - Gunakan manual untuk prototyping dan kustomisasi")
-    print("   - Gunakan library untuk production dan dataset besar")
+    stats = profiling.enable() if args.stages else None
+    report = run_suite(args.implementations, args.sizes, args.repeats, args.warmup, args.max_seconds,
+                       not args.no_memory, args.control_surface, args.lookup_table,
+                       distribution=args.distribution)
+    if stats is not None:
+        profiling.disable()
+        report['stages'] = stats.to_dict()
+        print("\n=== WAKTU PER TAHAP ===")
+        for implementation, stages in report['stages'].items():
+            for stage, entry in stages.items():
+                print(f"{implementation:<8} {stage:<16} {entry['calls']:>9} panggilan | {entry['samples']:>10} sampel | "
+                      f"{entry['seconds']:9.3f} detik | {entry['seconds_per_sample'] * 1e6:8.2f} µs/sampel")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nHasil tersimpan di {args.json}")
+
+    if args.accuracy:
+        benchmark_accuracy()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for name, size, ratio in regressions:
+            print(f"⚠️  Regresi: {name} n={size} {ratio:.2f}x lebih lambat dari baseline")
+        if regressions:
+            sys.exit(1)
+        print("✅ Tidak ada regresi performa")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,139 @@
+import argparse
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Universe resolution of main.FuzzyMamdaniSoilQuality: pH 0.1, nutrisi 1 mg/kg,
+# logam berat 0.1 mg/kg, bahan organik 0.1 %
+DEFAULT_STEPS = (0.1, 1.0, 0.1, 0.1)
+
+class ResultCache:
+    """Bounded LRU cache of evaluation results keyed on quantized inputs
+
+    `cell` maps the inputs of a sample to (key, values): samples with the
+    same key share one entry, whose result is computed for `values`. A
+    model whose result is the same for every input of a cell (like main,
+    which reads memberships at the nearest universe point) passes a cell
+    function that makes cached results exact. By default every input is
+    snapped to the nearest multiple of its step (None keeps the value as
+    is), which approximates models that interpolate between points; then
+    NaN and infinite inputs bypass the cache. Safe to share between threads.
+    """
+    def __init__(self, maxsize=100_000, steps=DEFAULT_STEPS, cell=None):
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        self.maxsize = maxsize
+        self.steps = tuple(steps)
+        self.cell = cell or self._snap
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks cannot be pickled; the copy gets its own
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _snap(self, values):
+        """Every input as its nearest multiple of the step, and those multiples"""
+        key = tuple(value if step is None else round(value / step) for value, step in zip(values, self.steps))
+        return key, tuple(value if step is None else k * step for value, k, step in zip(values, key, self.steps))
+
+    def key(self, values):
+        """Cell key of `values`"""
+        return self.cell(values)[0]
+
+    def get(self, values, compute):
+        """Cached compute(*cell values) for the cell of `values`"""
+        try:
+            key, cell_values = self.cell(values)
+        except (ValueError, OverflowError):
+            # NaN or infinite input: no cell to share
+            return compute(*values)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        # Computed outside the lock; two threads missing on the same key both compute it
+        result = compute(*cell_values)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def stats(self):
+        """Counters as a dict: hits, misses, evictions, size, maxsize and hit_rate"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._entries), 'maxsize': self.maxsize,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+def check_parity(samples=20_000, seed=0, **options):
+    """Number of main scores that change when the result cache is on
+
+    The inputs are random 2-decimal values (a little beyond the universes
+    too) and values exactly halfway between neighbouring universe points,
+    where the nearest point is a tie, with their neighbours just below and
+    above. All are scored twice through one cached system, in input order
+    and then shuffled, so most lookups hit entries filled by other inputs of
+    the same cell. `options` go to FuzzyMamdaniSoilQuality.
+    """
+    from main import FuzzyMamdaniSoilQuality
+    reference = FuzzyMamdaniSoilQuality(**options)
+    cached = FuzzyMamdaniSoilQuality(cache_size=4 * samples, **options)
+    rng = np.random.default_rng(seed)
+    columns = []
+    for universe in (reference.ph_range, reference.nutrition_range, reference.heavy_metal_range,
+                     reference.organic_matter_range):
+        low, high = float(universe[0]), float(universe[-1])
+        margin = (high - low) * 0.05
+        left = rng.integers(0, len(universe) - 1, samples)
+        half = (universe[left] + universe[left + 1]) / 2
+        columns.append(np.concatenate([np.round(rng.uniform(low - margin, high + margin, samples), 2),
+                                       half, np.nextafter(half, -np.inf), np.nextafter(half, np.inf)]))
+    X = np.column_stack(columns)[rng.permutation(4 * samples)].tolist()
+
+    expected = [reference.evaluate_soil_quality(*row) for row in X]
+    mismatches = 0
+    for order in (range(len(X)), rng.permutation(len(X))):
+        mismatches += sum(cached.evaluate_soil_quality(*X[i]) != expected[i] for i in order)
+    return mismatches, cached.result_cache.stats()
+
+def main():
+    parser = argparse.ArgumentParser(description="Periksa bahwa cache hasil tidak mengubah skor main.FuzzyMamdaniSoilQuality")
+    parser.add_argument('--samples', type=int, default=20_000, help="jumlah input per jenis (acak, tengah, kiri, kanan)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--interpolate', action='store_true', help="periksa mode interpolasi")
+    parser.add_argument('--defuzzification', choices=['discrete', 'analytic'], default='discrete')
+    args = parser.parse_args()
+
+    mismatches, stats = check_parity(args.samples, args.seed, interpolate=args.interpolate,
+                                     defuzzification=args.defuzzification)
+    print(f"{8 * args.samples} evaluasi, hit rate {stats['hit_rate']:.1%}")
+    print("✅ Skor dengan cache identik dengan tanpa cache" if mismatches == 0
+          else f"❌ {mismatches} skor berbeda dari evaluasi tanpa cache")
+    raise SystemExit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
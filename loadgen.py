@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import numpy as np
+
+def _random_inputs(n, seed=0):
+    """Uniform inputs over the universes, as benchmark.random_inputs (without importing the models)"""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(4, 9, n), rng.uniform(0, 350, n),
+                            rng.uniform(0, 30, n), rng.uniform(0, 10, n)])
+
+async def _request(reader, writer, host, body):
+    writer.write(f"POST /score HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def _client(host, port, bodies, latencies, errors):
+    """One keep-alive connection sending its requests back to back"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            status = await _request(reader, writer, host, body)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+async def run_load(host='127.0.0.1', port=8080, requests=2_000, concurrency=32, samples_per_request=1, seed=0):
+    """Send `requests` score requests over `concurrency` connections; latency and throughput stats
+
+    Every connection is a closed loop (the next request goes out when the
+    reply arrives), so `concurrency` is the number of requests in flight
+    and the server can batch at most that many together.
+    """
+    X = _random_inputs(requests * samples_per_request, seed)
+    keys = ('ph', 'nutrition', 'heavy_metal', 'organic_matter')
+    bodies = []
+    for i in range(requests):
+        rows = X[i * samples_per_request:(i + 1) * samples_per_request]
+        payload = dict(zip(keys, rows[0].tolist())) if samples_per_request == 1 else {'samples': rows.tolist()}
+        bodies.append(json.dumps(payload).encode())
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, bodies[c::concurrency], latencies, errors)
+                           for c in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {
+        'requests': requests, 'concurrency': concurrency, 'samples_per_request': samples_per_request,
+        'errors': len(errors), 'seconds': elapsed,
+        'p50_ms': p50 * 1e3, 'p90_ms': p90 * 1e3, 'p99_ms': p99 * 1e3, 'max_ms': latencies.max() * 1e3,
+        'requests_per_s': requests / elapsed, 'samples_per_s': requests * samples_per_request / elapsed,
+    }
+
+async def _wait_ready(host, port, timeout):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator beban untuk server.py: latensi p50/p99 dan throughput")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--requests', type=int, default=2_000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128],
+                        help="jumlah koneksi paralel; beberapa nilai dijalankan berurutan")
+    parser.add_argument('--samples-per-request', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn', nargs=argparse.REMAINDER, default=None,
+                        help="jalankan server.py dengan argumen berikutnya selama pengujian, mis. --spawn --model main")
+    parser.add_argument('--json', default=None, help="simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn is not None:
+        server = subprocess.Popen([sys.executable, 'server.py', '--host', args.host, '--port', str(args.port)]
+                                  + args.spawn, stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(_wait_ready(args.host, args.port, timeout=60))
+        print(f"GENERATOR BEBAN ({args.requests} request, {args.samples_per_request} sampel/request)")
+        print("=" * 50)
+        results = []
+        for concurrency in args.concurrency:
+            entry = asyncio.run(run_load(args.host, args.port, args.requests, concurrency,
+                                         args.samples_per_request, args.seed))
+            results.append(entry)
+            print(f"koneksi {concurrency:>4} | p50 {entry['p50_ms']:8.2f} ms | p99 {entry['p99_ms']:8.2f} ms | "
+                  f"{entry['requests_per_s']:9,.0f} request/detik | {entry['samples_per_s']:10,.0f} sampel/detik"
+                  + (f" | {entry['errors']} gagal" if entry['errors'] else ""))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nHasil tersimpan di {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import numpy as np
+from numpy.lib.format import open_memmap
+from main import FuzzyMamdaniSoilQuality
+
+UNIVERSES = ('ph_range', 'nutrition_range', 'heavy_metal_range', 'organic_matter_range')
+TABLES = ('ph_membership_table', 'nutrition_membership_table',
+          'heavy_metal_membership_table', 'organic_matter_membership_table')
+
+# uint8 tables store round(score * UINT8_SCALE); scores stay within the 0-100.9 quality universe
+UINT8_SCALE = 2.5
+THRESHOLDS = (40, 70)
+
+def encode(scores, dtype):
+    """Scores in the table dtype, nudged so no score crosses a category threshold"""
+    if np.dtype(dtype) == np.uint8:
+        codes = np.rint(scores * UINT8_SCALE)
+        for threshold in THRESHOLDS:
+            codes = np.where((scores < threshold) & (codes / UINT8_SCALE >= threshold), codes - 1, codes)
+            codes = np.where((scores >= threshold) & (codes / UINT8_SCALE < threshold), codes + 1, codes)
+        return codes.astype(np.uint8)
+    codes = scores.astype(dtype)
+    for threshold in THRESHOLDS:
+        below = np.nextafter(np.asarray(threshold, dtype), np.asarray(0, dtype))
+        codes = np.where((scores < threshold) & (codes >= threshold), below, codes)
+        codes = np.where((scores >= threshold) & (codes < threshold), np.asarray(threshold, dtype), codes)
+    return codes.astype(dtype)
+
+def decode(codes):
+    """Scores as float64 from table values"""
+    if codes.dtype == np.uint8:
+        return codes / UINT8_SCALE
+    return codes.astype(float)
+
+def compile_table(path, system=None, dtype=np.float16, chunk_size=65536):
+    """Evaluate `system` at every point of its input grid and save the scores as a 4-D .npy
+
+    Most neighbouring universe points share the same membership degrees
+    (nutrition has only four distinct ones), so the system is evaluated
+    once per combination of distinct degree triples and the scores are then
+    expanded to the full grid one pH slice at a time, straight into the
+    memory-mapped output file. Only nearest-point lookup yields a finite
+    table, so interpolating systems are rejected.
+    """
+    system = system or FuzzyMamdaniSoilQuality()
+    if system.interpolate:
+        raise ValueError("A lookup table can only be compiled for interpolate=False")
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float16, np.float32, np.uint8):
+        raise ValueError(f"Unsupported table dtype: {dtype}")
+
+    # Distinct membership triples per input, and which one every universe point uses
+    distinct, inverse = [], []
+    for table in TABLES:
+        triples, index = np.unique(np.column_stack(getattr(system, table)()), axis=0, return_inverse=True)
+        distinct.append(triples)
+        inverse.append(index.ravel())
+
+    # Score every combination of distinct triples, defuzzifying each distinct set of
+    # aggregated strengths once
+    sizes = [len(triples) for triples in distinct]
+    combinations = np.prod(sizes)
+    alphas = np.empty((combinations, len(system.rule_base.output_terms)))
+    for start in range(0, combinations, chunk_size):
+        flat = np.arange(start, min(start + chunk_size, combinations))
+        memberships = np.column_stack([triples[i] for triples, i in zip(distinct, np.unravel_index(flat, sizes))])
+        alphas[start:start + chunk_size] = system.rule_base.alphas(memberships)
+    alphas, alpha_index = np.unique(alphas, axis=0, return_inverse=True)
+    alpha_scores = np.concatenate([system.defuzzify_batch(*alphas[start:start + chunk_size].T)
+                                   for start in range(0, len(alphas), chunk_size)])
+    compact = encode(alpha_scores[alpha_index.ravel()], dtype).reshape(sizes)
+
+    shape = tuple(len(getattr(system, name)) for name in UNIVERSES)
+    table = open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+    rest = np.ix_(*inverse[1:])
+    for i, ph_index in enumerate(inverse[0]):
+        table[i] = compact[ph_index][rest]
+    table.flush()
+    del table
+    return LookupTable(path, system)
+
+class LookupTable:
+    """Scores read from a compiled 4-D table
+
+    The table is opened with mmap_mode='r' by default, so worker processes
+    that load the same file share its pages instead of each holding a copy.
+    `system` supplies the universes used to turn inputs into grid indices
+    and must match the one the table was compiled from.
+    """
+    def __init__(self, path, system=None, mmap_mode='r'):
+        self.system = system or FuzzyMamdaniSoilQuality()
+        self.table = np.load(path, mmap_mode=mmap_mode)
+        shape = tuple(len(getattr(self.system, name)) for name in UNIVERSES)
+        if self.table.shape != shape:
+            raise ValueError(f"Table shape {self.table.shape} does not match the system universes {shape}")
+
+    def evaluate(self, ph, nutrition, heavy_metal, organic_matter):
+        """Scores and categories for scalars or arrays of inputs, like evaluate_batch"""
+        index = tuple(self.system.nearest_indices(name, values)
+                      for name, values in zip(UNIVERSES, (ph, nutrition, heavy_metal, organic_matter)))
+        scores = decode(np.asarray(self.table[index]))
+        categories = np.where(scores < 40, "Buruk", np.where(scores < 70, "Sedang", "Baik"))
+        return scores, categories
+
+def main():
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Kompilasi sistem fuzzy (main.py) menjadi tabel skor 4-D .npy")
+    parser.add_argument('output', help="file .npy tujuan")
+    parser.add_argument('--dtype', choices=['float16', 'float32', 'uint8'], default='float16')
+    parser.add_argument('--defuzzification', choices=['discrete', 'analytic'], default='discrete')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = compile_table(args.output, FuzzyMamdaniSoilQuality(defuzzification=args.defuzzification), args.dtype)
+    print(f"Tabel {table.table.shape} ({args.dtype}, {table.table.nbytes / 2**20:.0f} MB) "
+          f"dikompilasi dalam {time.perf_counter() - start:.1f} detik")
+    print(f"Tersimpan di {args.output}")
+
+if __name__ == "__main__":
+    main()
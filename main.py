@@ -1,224 +1,259 @@
+import bisect
+import threading
 import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
+from cache import ResultCache
+from centroid import AnalyticCentroid
+import profiling
+from rules import RULE_BASE
+from scenario import Scenario
+
+class _Universe:
+    """Universe of discourse attribute; assigning a new universe drops everything cached from the old ones"""
+    def __set_name__(self, owner, name):
+        self.attr = '_' + name
+    
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj, self.attr)
+    
+    def __set__(self, obj, value):
+        setattr(obj, self.attr, np.asarray(value))
+        obj._universe_cache = {}
+
+def _membership_terms(universe, *terms):
+    """Evaluate piecewise membership terms over a universe
+    
+    Each term is (upper_bounds, values, otherwise): the value of the first
+    bound with x <= bound is taken, like the if/elif chains the tables were
+    originally written with. Results keep the universe dtype (as zeros_like
+    did) and are read-only because they are shared through the cache.
+    """
+    tables = []
+    for bounds, values, otherwise in terms:
+        table = np.select([universe <= b for b in bounds], values, otherwise).astype(universe.dtype)
+        table.flags.writeable = False
+        tables.append(table)
+    return tuple(tables)
 
 class FuzzyMamdaniSoilQuality:
-    def __init__(self):
-        # Define universe of discourse for each parameter
-        self.ph_range = np.arange(4.0, 9.1, 0.1)
-        self.nutrition_range = np.arange(0, 351, 1)
-        self.heavy_metal_range = np.arange(0, 31, 0.1)
-        self.organic_matter_range = np.arange(0, 11, 0.1)
-        self.quality_range = np.arange(0, 101, 0.1)
+    ph_range = _Universe()
+    nutrition_range = _Universe()
+    heavy_metal_range = _Universe()
+    organic_matter_range = _Universe()
+    quality_range = _Universe()
+    
+    # Default universes as np.arange(start, stop, step) per variable; see `resolution`
+    universes = {
+        'ph': (4.0, 9.1, 0.1),
+        'nutrition': (0, 351, 1),
+        'heavy_metal': (0, 31, 0.1),
+        'organic_matter': (0, 11, 0.1),
+        'quality': (0, 101, 0.1),
+    }
+    
+    # Output terms as (x, μ) breakpoints, the same shapes quality_membership_functions
+    # samples; used by analytic defuzzification
+    quality_breakpoints = (
+        [(0, 1.0), (25, 0.0), (25, 1.0), (50, 0.0)],  # buruk
+        [(20, 0.0), (50, 1.0), (80, 0.0)],            # sedang
+        [(50, 0.0), (75, 1.0)],                       # baik
+    )
+    
+    def __init__(self, interpolate=False, defuzzification='discrete', rule_base=RULE_BASE, cache_size=None,
+                 dtype=np.float64, resolution=None):
+        self.rule_base = rule_base
+        
+        # Read membership degrees at the nearest universe point, or interpolate
+        # linearly between the two neighbouring points
+        self.interpolate = interpolate
+        
+        # 'discrete' sums over quality_range; 'analytic' computes the exact centroid
+        # of the clipped output terms in constant time
+        if defuzzification not in ('discrete', 'analytic'):
+            raise ValueError(f"Unknown defuzzification method: {defuzzification!r}")
+        self.defuzzification = defuzzification
+        
+        # Keep up to cache_size results of evaluate_soil_quality, keyed on the
+        # universe points the inputs are read at (None disables the cache)
+        self.cache_size = cache_size
+        
+        # Work arrays for defuzzification, one set per thread, reused between calls
+        self._scratch = threading.local()
+        
+        # Define universe of discourse for each parameter. `resolution` maps a variable
+        # to its grid step, or to a whole (start, stop, step), replacing the default in
+        # `universes`. The real-valued universes (and so the membership tables and
+        # defuzzification) use `dtype`, e.g. np.float32 to halve their size. The
+        # default nutrition grid is the one exception: it keeps its integer points,
+        # so its membership tables only hold 0 and 1 as in the original code. Any
+        # nutrition resolution, whether its step is written as 5 or 5.0, uses `dtype`.
+        universes = self.universe_specs(resolution)
+        self.ph_range = np.arange(*universes['ph']).astype(dtype)
+        self.nutrition_range = np.arange(*universes['nutrition'])
+        if 'nutrition' in (resolution or {}):
+            self.nutrition_range = self.nutrition_range.astype(dtype)
+        self.heavy_metal_range = np.arange(*universes['heavy_metal']).astype(dtype)
+        self.organic_matter_range = np.arange(*universes['organic_matter']).astype(dtype)
+        self.quality_range = np.arange(*universes['quality']).astype(dtype)
+        
+        # Build every membership table once; they are rebuilt only if a universe is replaced
+        self.ph_membership_table()
+        self.nutrition_membership_table()
+        self.heavy_metal_membership_table()
+        self.organic_matter_membership_table()
+        self.quality_membership_functions()
+    
+    def __getstate__(self):
+        # Thread-local scratch arrays cannot be pickled or copied; a copy starts with empty ones
+        state = self.__dict__.copy()
+        del state['_scratch']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._scratch = threading.local()
+    
+    @classmethod
+    def universe_specs(cls, resolution=None):
+        """(start, stop, step) of every universe after applying a `resolution` mapping"""
+        specs = dict(cls.universes)
+        for name, value in (resolution or {}).items():
+            if name not in specs:
+                raise ValueError(f"Unknown variable in resolution: {name!r}")
+            start, stop, step = value if isinstance(value, tuple) else (*specs[name][:2], value)
+            if not step > 0:
+                raise ValueError(f"Step for {name!r} must be positive, got {step!r}")
+            if len(np.arange(start, stop, step)) < 2:
+                raise ValueError(f"Universe for {name!r} needs at least two points, "
+                                 f"got np.arange({start!r}, {stop!r}, {step!r})")
+            specs[name] = (start, stop, step)
+        return specs
+    
+    def _cached(self, name, build):
+        """Return the cached value `name` derived from the universes, building it on first use"""
+        if name not in self._universe_cache:
+            self._universe_cache[name] = build()
+        return self._universe_cache[name]
+    
+    def _work_arrays(self, rows=None):
+        """Two scratch arrays shaped like quality_range (or rows x quality_range) for this thread
+        
+        They are reallocated only when the quality universe changes or more
+        rows are needed than before; callers slice the first `rows` rows.
+        """
+        universe = self.quality_range
+        shape = universe.shape if rows is None else (rows,) + universe.shape
+        key = 'single' if rows is None else 'rows'
+        arrays = getattr(self._scratch, key, None)
+        if (arrays is None or arrays[0].dtype != universe.dtype or arrays[0].shape[-1] != universe.shape[-1]
+                or arrays[0].shape[0] < shape[0]):
+            arrays = (np.empty(shape, universe.dtype), np.empty(shape, universe.dtype))
+            setattr(self._scratch, key, arrays)
+        return arrays
         
+    def ph_membership_table(self):
+        """Membership values for pH over the whole universe"""
+        def build():
+            ph = self.ph_range
+            return _membership_terms(
+                ph,
+                # Asam: < 6.0 (triangular: 4.0-6.0)
+                ([4.0, 6.0], [1.0, (6.0 - ph) / 2.0], 0.0),
+                # Normal: 6.0-7.0 (triangular: 5.5-7.5)
+                ([5.5, 6.5, 7.5], [0.0, (ph - 5.5) / 1.0, (7.5 - ph) / 1.0], 0.0),
+                # Basa: > 7.0 (triangular: 6.5-9.0)
+                ([6.5, 9.0], [0.0, (ph - 6.5) / 2.5], 1.0),
+            )
+        return self._cached('ph', build)
+    
     def ph_membership(self, ph_value):
         """Calculate membership values for pH"""
-        asam = np.zeros_like(self.ph_range)
-        normal = np.zeros_like(self.ph_range)
-        basa = np.zeros_like(self.ph_range)
-        
-        # Asam: < 6.0 (triangular: 4.0-6.0)
-        for i, ph in enumerate(self.ph_range):
-            if ph <= 4.0:
-                asam[i] = 1.0
-            elif 4.0 < ph <= 6.0:
-                asam[i] = (6.0 - ph) / 2.0
-            else:
-                asam[i] = 0.0
-                
-        # Normal: 6.0-7.0 (triangular: 5.5-7.5)
-        for i, ph in enumerate(self.ph_range):
-            if ph <= 5.5:
-                normal[i] = 0.0
-            elif 5.5 < ph <= 6.5:
-                normal[i] = (ph - 5.5) / 1.0
-            elif 6.5 < ph <= 7.5:
-                normal[i] = (7.5 - ph) / 1.0
-            else:
-                normal[i] = 0.0
-                
-        # Basa: > 7.0 (triangular: 6.5-9.0)
-        for i, ph in enumerate(self.ph_range):
-            if ph <= 6.5:
-                basa[i] = 0.0
-            elif 6.5 < ph <= 9.0:
-                basa[i] = (ph - 6.5) / 2.5
-            else:
-                basa[i] = 1.0
-                
-        # Find membership value for input
-        ph_idx = np.argmin(np.abs(self.ph_range - ph_value))
-        return asam[ph_idx], normal[ph_idx], basa[ph_idx]
+        return self._lookup('ph_range', self.ph_membership_table(), ph_value)
+    
+    def nutrition_membership_table(self):
+        """Membership values for nutrition content over the whole universe"""
+        def build():
+            nut = self.nutrition_range
+            return _membership_terms(
+                nut,
+                # Rendah: < 100 (triangular: 0-150)
+                ([0, 100, 150], [1.0, (100 - nut) / 100, (150 - nut) / 50], 0.0),
+                # Sedang: 100-200 (triangular: 50-250)
+                ([50, 150, 250], [0.0, (nut - 50) / 100, (250 - nut) / 100], 0.0),
+                # Tinggi: > 200 (triangular: 150-350)
+                ([150, 200], [0.0, (nut - 150) / 50], 1.0),
+            )
+        return self._cached('nutrition', build)
     
     def nutrition_membership(self, nutrition_value):
         """Calculate membership values for nutrition content"""
-        rendah = np.zeros_like(self.nutrition_range)
-        sedang = np.zeros_like(self.nutrition_range)
-        tinggi = np.zeros_like(self.nutrition_range)
-        
-        # Rendah: < 100 (triangular: 0-150)
-        for i, nut in enumerate(self.nutrition_range):
-            if nut <= 0:
-                rendah[i] = 1.0
-            elif 0 < nut <= 100:
-                rendah[i] = (100 - nut) / 100
-            elif 100 < nut <= 150:
-                rendah[i] = (150 - nut) / 50
-            else:
-                rendah[i] = 0.0
-                
-        # Sedang: 100-200 (triangular: 50-250)
-        for i, nut in enumerate(self.nutrition_range):
-            if nut <= 50:
-                sedang[i] = 0.0
-            elif 50 < nut <= 150:
-                sedang[i] = (nut - 50) / 100
-            elif 150 < nut <= 250:
-                sedang[i] = (250 - nut) / 100
-            else:
-                sedang[i] = 0.0
-                
-        # Tinggi: > 200 (triangular: 150-350)
-        for i, nut in enumerate(self.nutrition_range):
-            if nut <= 150:
-                tinggi[i] = 0.0
-            elif 150 < nut <= 200:
-                tinggi[i] = (nut - 150) / 50
-            elif 200 < nut <= 350:
-                tinggi[i] = 1.0
-            else:
-                tinggi[i] = 1.0
-                
-        # Find membership value for input
-        nut_idx = np.argmin(np.abs(self.nutrition_range - nutrition_value))
-        return rendah[nut_idx], sedang[nut_idx], tinggi[nut_idx]
+        return self._lookup('nutrition_range', self.nutrition_membership_table(), nutrition_value)
+    
+    def heavy_metal_membership_table(self):
+        """Membership values for heavy metal content over the whole universe"""
+        def build():
+            metal = self.heavy_metal_range
+            return _membership_terms(
+                metal,
+                # Rendah: < 10 (triangular: 0-15)
+                ([0, 10, 15], [1.0, (10 - metal) / 10, (15 - metal) / 5], 0.0),
+                # Sedang: 10-20 (triangular: 5-25)
+                ([5, 15, 25], [0.0, (metal - 5) / 10, (25 - metal) / 10], 0.0),
+                # Tinggi: > 20 (triangular: 15-30)
+                ([15, 20], [0.0, (metal - 15) / 5], 1.0),
+            )
+        return self._cached('heavy_metal', build)
     
     def heavy_metal_membership(self, metal_value):
         """Calculate membership values for heavy metal content"""
-        rendah = np.zeros_like(self.heavy_metal_range)
-        sedang = np.zeros_like(self.heavy_metal_range)
-        tinggi = np.zeros_like(self.heavy_metal_range)
-        
-        # Rendah: < 10 (triangular: 0-15)
-        for i, metal in enumerate(self.heavy_metal_range):
-            if metal <= 0:
-                rendah[i] = 1.0
-            elif 0 < metal <= 10:
-                rendah[i] = (10 - metal) / 10
-            elif 10 < metal <= 15:
-                rendah[i] = (15 - metal) / 5
-            else:
-                rendah[i] = 0.0
-                
-        # Sedang: 10-20 (triangular: 5-25)
-        for i, metal in enumerate(self.heavy_metal_range):
-            if metal <= 5:
-                sedang[i] = 0.0
-            elif 5 < metal <= 15:
-                sedang[i] = (metal - 5) / 10
-            elif 15 < metal <= 25:
-                sedang[i] = (25 - metal) / 10
-            else:
-                sedang[i] = 0.0
-                
-        # Tinggi: > 20 (triangular: 15-30)
-        for i, metal in enumerate(self.heavy_metal_range):
-            if metal <= 15:
-                tinggi[i] = 0.0
-            elif 15 < metal <= 20:
-                tinggi[i] = (metal - 15) / 5
-            elif 20 < metal <= 30:
-                tinggi[i] = 1.0
-            else:
-                tinggi[i] = 1.0
-                
-        # Find membership value for input
-        metal_idx = np.argmin(np.abs(self.heavy_metal_range - metal_value))
-        return rendah[metal_idx], sedang[metal_idx], tinggi[metal_idx]
+        return self._lookup('heavy_metal_range', self.heavy_metal_membership_table(), metal_value)
+    
+    def organic_matter_membership_table(self):
+        """Membership values for organic matter content over the whole universe"""
+        def build():
+            org = self.organic_matter_range
+            return _membership_terms(
+                org,
+                # Rendah: < 2 (triangular: 0-3)
+                ([0, 2, 3], [1.0, (2 - org) / 2, (3 - org) / 1], 0.0),
+                # Sedang: 2-5 (triangular: 1-6)
+                ([1, 3.5, 6], [0.0, (org - 1) / 2.5, (6 - org) / 2.5], 0.0),
+                # Tinggi: > 5 (triangular: 4-10)
+                ([4, 5], [0.0, (org - 4) / 1], 1.0),
+            )
+        return self._cached('organic_matter', build)
     
     def organic_matter_membership(self, organic_value):
         """Calculate membership values for organic matter content"""
-        rendah = np.zeros_like(self.organic_matter_range)
-        sedang = np.zeros_like(self.organic_matter_range)
-        tinggi = np.zeros_like(self.organic_matter_range)
-        
-        # Rendah: < 2 (triangular: 0-3)
-        for i, org in enumerate(self.organic_matter_range):
-            if org <= 0:
-                rendah[i] = 1.0
-            elif 0 < org <= 2:
-                rendah[i] = (2 - org) / 2
-            elif 2 < org <= 3:
-                rendah[i] = (3 - org) / 1
-            else:
-                rendah[i] = 0.0
-                
-        # Sedang: 2-5 (triangular: 1-6)
-        for i, org in enumerate(self.organic_matter_range):
-            if org <= 1:
-                sedang[i] = 0.0
-            elif 1 < org <= 3.5:
-                sedang[i] = (org - 1) / 2.5
-            elif 3.5 < org <= 6:
-                sedang[i] = (6 - org) / 2.5
-            else:
-                sedang[i] = 0.0
-                
-        # Tinggi: > 5 (triangular: 4-10)
-        for i, org in enumerate(self.organic_matter_range):
-            if org <= 4:
-                tinggi[i] = 0.0
-            elif 4 < org <= 5:
-                tinggi[i] = (org - 4) / 1
-            elif 5 < org <= 10:
-                tinggi[i] = 1.0
-            else:
-                tinggi[i] = 1.0
-                
-        # Find membership value for input
-        org_idx = np.argmin(np.abs(self.organic_matter_range - organic_value))
-        return rendah[org_idx], sedang[org_idx], tinggi[org_idx]
+        return self._lookup('organic_matter_range', self.organic_matter_membership_table(), organic_value)
     
     def quality_membership_functions(self):
         """Define membership functions for soil quality output"""
-        buruk = np.zeros_like(self.quality_range)
-        sedang = np.zeros_like(self.quality_range)
-        baik = np.zeros_like(self.quality_range)
-        
-        # Buruk: 0-40 (triangular: 0-50)
-        for i, qual in enumerate(self.quality_range):
-            if qual <= 0:
-                buruk[i] = 1.0
-            elif 0 < qual <= 25:
-                buruk[i] = (25 - qual) / 25
-            elif 25 < qual <= 50:
-                buruk[i] = (50 - qual) / 25
-            else:
-                buruk[i] = 0.0
-                
-        # Sedang: 30-70 (triangular: 20-80)
-        for i, qual in enumerate(self.quality_range):
-            if qual <= 20:
-                sedang[i] = 0.0
-            elif 20 < qual <= 50:
-                sedang[i] = (qual - 20) / 30
-            elif 50 < qual <= 80:
-                sedang[i] = (80 - qual) / 30
-            else:
-                sedang[i] = 0.0
-                
-        # Baik: 60-100 (triangular: 50-100)
-        for i, qual in enumerate(self.quality_range):
-            if qual <= 50:
-                baik[i] = 0.0
-            elif 50 < qual <= 75:
-                baik[i] = (qual - 50) / 25
-            elif 75 < qual <= 100:
-                baik[i] = 1.0
-            else:
-                baik[i] = 1.0
-                
-        return buruk, sedang, baik
+        def build():
+            qual = self.quality_range
+            return _membership_terms(
+                qual,
+                # Buruk: 0-40 (triangular: 0-50)
+                ([0, 25, 50], [1.0, (25 - qual) / 25, (50 - qual) / 25], 0.0),
+                # Sedang: 30-70 (triangular: 20-80)
+                ([20, 50, 80], [0.0, (qual - 20) / 30, (80 - qual) / 30], 0.0),
+                # Baik: 60-100 (triangular: 50-100)
+                ([50, 75], [0.0, (qual - 50) / 25], 1.0),
+            )
+        return self._cached('quality', build)
+    
+    def fuzzy_rule_alphas(self, ph_asam, ph_normal, ph_basa,
+                          nut_rendah, nut_sedang, nut_tinggi,
+                          metal_rendah, metal_sedang, metal_tinggi,
+                          org_rendah, org_sedang, org_tinggi):
+        """Fire the fuzzy rules (see rules.RULES) and aggregate their strengths per output term (buruk, sedang, baik)"""
+        return tuple(self.rule_base.alphas_single([
+            ph_asam, ph_normal, ph_basa,
+            nut_rendah, nut_sedang, nut_tinggi,
+            metal_rendah, metal_sedang, metal_tinggi,
+            org_rendah, org_sedang, org_tinggi
+        ]))
     
     def apply_fuzzy_rules(self, ph_asam, ph_normal, ph_basa, 
                          nut_rendah, nut_sedang, nut_tinggi,
@@ -226,35 +261,17 @@ class FuzzyMamdaniSoilQuality:
                          org_rendah, org_sedang, org_tinggi):
         """Apply fuzzy rules and get output membership values"""
         buruk, sedang, baik = self.quality_membership_functions()
+        alpha_buruk, alpha_sedang, alpha_baik = self.fuzzy_rule_alphas(
+            ph_asam, ph_normal, ph_basa,
+            nut_rendah, nut_sedang, nut_tinggi,
+            metal_rendah, metal_sedang, metal_tinggi,
+            org_rendah, org_sedang, org_tinggi
+        )
         
-        # Initialize output membership arrays
-        output_buruk = np.zeros_like(self.quality_range)
-        output_sedang = np.zeros_like(self.quality_range)
-        output_baik = np.zeros_like(self.quality_range)
-        
-        # Rule 1: Jika pH normal dan kandungan nutrisi tinggi dan kandungan logam berat rendah, maka kualitas tanah baik
-        rule1_strength = min(ph_normal, nut_tinggi, metal_rendah)
-        output_baik = np.maximum(output_baik, np.minimum(rule1_strength, baik))
-        
-        # Rule 2: Jika pH asam atau basa dan kandungan nutrisi rendah dan kandungan logam berat tinggi, maka kualitas tanah buruk
-        rule2_strength = min(max(ph_asam, ph_basa), nut_rendah, metal_tinggi)
-        output_buruk = np.maximum(output_buruk, np.minimum(rule2_strength, buruk))
-        
-        # Rule 3: Jika pH normal dan kandungan nutrisi sedang dan kandungan logam berat sedang, maka kualitas tanah sedang
-        rule3_strength = min(ph_normal, nut_sedang, metal_sedang)
-        output_sedang = np.maximum(output_sedang, np.minimum(rule3_strength, sedang))
-        
-        # Rule 4: Jika kandungan bahan organik tinggi, maka kualitas tanah baik
-        rule4_strength = org_tinggi
-        output_baik = np.maximum(output_baik, np.minimum(rule4_strength, baik))
-        
-        # Rule 5: Jika kandungan bahan organik rendah dan kandungan logam berat tinggi, maka kualitas tanah buruk
-        rule5_strength = min(org_rendah, metal_tinggi)
-        output_buruk = np.maximum(output_buruk, np.minimum(rule5_strength, buruk))
-        
-        # Rule 6: Jika pH normal dan kandungan nutrisi tinggi dan kandungan logam berat sedang, maka kualitas tanah sedang
-        rule6_strength = min(ph_normal, nut_tinggi, metal_sedang)
-        output_sedang = np.maximum(output_sedang, np.minimum(rule6_strength, sedang))
+        # Clip each output term at the strength of its strongest rule
+        output_buruk = np.minimum(alpha_buruk, buruk)
+        output_sedang = np.minimum(alpha_sedang, sedang)
+        output_baik = np.minimum(alpha_baik, baik)
         
         return output_buruk, output_sedang, output_baik
     
@@ -272,24 +289,133 @@ class FuzzyMamdaniSoilQuality:
         
         return numerator / denominator
     
+    def _defuzzify_fired(self, alpha_buruk, alpha_sedang, alpha_baik):
+        """defuzzify(*apply_fuzzy_rules(...)) from the rule strengths, skipping output terms no rule fired
+        
+        A term clipped at 0 is all zeros and cannot change the maximum, so the
+        result is identical while most samples clip one term instead of three.
+        The clipping and products are written into per-thread work arrays, so
+        no universe-sized array is allocated per call.
+        """
+        combined_output, clipped = self._work_arrays()
+        fired = False
+        for alpha, term in zip((alpha_buruk, alpha_sedang, alpha_baik), self.quality_membership_functions()):
+            if alpha > 0:
+                if not fired:
+                    np.minimum(alpha, term, out=combined_output)
+                    fired = True
+                else:
+                    np.minimum(alpha, term, out=clipped)
+                    np.maximum(combined_output, clipped, out=combined_output)
+        if not fired:
+            return 50.0  # Default to middle value if no rules fired
+        
+        numerator = np.multiply(self.quality_range, combined_output, out=clipped).sum()
+        denominator = combined_output.sum()
+        
+        if denominator == 0:
+            return 50.0
+        
+        return numerator / denominator
+    
+    def defuzzify_analytic(self, alpha_buruk, alpha_sedang, alpha_baik):
+        """Defuzzify with the exact Center of Gravity of the clipped output terms
+        
+        Takes the aggregated rule strengths (scalars or arrays) instead of sampled
+        output arrays; see centroid.AnalyticCentroid.
+        """
+        centroid = self._cached('quality centroid', lambda: AnalyticCentroid(
+            self.quality_breakpoints, self.quality_range[0], self.quality_range[-1]))
+        if np.ndim(alpha_buruk) == 0:
+            return centroid.single((alpha_buruk, alpha_sedang, alpha_baik))
+        return centroid(np.column_stack([alpha_buruk, alpha_sedang, alpha_baik]))
+    
+    @property
+    def result_cache(self):
+        """ResultCache in front of evaluate_soil_quality, or None when caching is off
+        
+        It lives with the other universe-derived data, so replacing a universe
+        starts a fresh cache.
+        """
+        if not self.cache_size:
+            return None
+        if 'result cache' in self._universe_cache:
+            return self._universe_cache['result cache']
+        return self._cached('result cache', lambda: ResultCache(self.cache_size, cell=self._cache_cell))
+    
+    def _cache_cell(self, values):
+        """Result cache cell of one sample: the universe points its memberships are read at
+        
+        Every input in a cell reads the same membership degrees, so the score
+        computed at the cell's points is exactly the score of each of them.
+        With interpolation the degrees change within a cell, so only equal
+        inputs share an entry.
+        """
+        if self.interpolate:
+            return tuple(values), values
+        indices, points = [], []
+        for name, value in zip(('ph_range', 'nutrition_range', 'heavy_metal_range', 'organic_matter_range'), values):
+            universe = self._cached(name + ' points', getattr(self, name).tolist)
+            value = float(value)
+            # Clipped like the lookups: out of range reads the edge, NaN the first point
+            value = universe[0] if value != value else min(max(value, universe[0]), universe[-1])
+            idx = self._nearest_index_scalar(universe, self._grid_step(name), value)
+            indices.append(idx)
+            points.append(universe[idx])
+        return tuple(indices), tuple(points)
+    
+    def scenario(self, ph, nutrition, heavy_metal, organic_matter):
+        """Scenario for one sample, re-scored after updating single inputs (see scenario.Scenario)
+        
+        Scores match evaluate_soil_quality without the result cache.
+        """
+        fuzzifiers = {'ph': self.ph_membership, 'nutrition': self.nutrition_membership,
+                      'heavy_metal': self.heavy_metal_membership, 'organic_matter': self.organic_matter_membership}
+        defuzzify = self.defuzzify_analytic if self.defuzzification == 'analytic' else self._defuzzify_fired
+        return Scenario(fuzzifiers, lambda alphas: defuzzify(*alphas), (ph, nutrition, heavy_metal, organic_matter),
+                        self.rule_base)
+    
     def evaluate_soil_quality(self, ph, nutrition, heavy_metal, organic_matter):
         """Evaluate soil quality using fuzzy Mamdani system"""
+        if self.cache_size:
+            return self.result_cache.get((ph, nutrition, heavy_metal, organic_matter), self._evaluate_soil_quality)
+        return self._evaluate_soil_quality(ph, nutrition, heavy_metal, organic_matter)
+    
+    def _evaluate_soil_quality(self, ph, nutrition, heavy_metal, organic_matter):
+        """Evaluate one sample without the result cache"""
+        # Stage timings are only taken while profiling is active
+        stats = profiling.active
+        start = stats and stats.now()
+        
         # Get membership values for inputs
         ph_asam, ph_normal, ph_basa = self.ph_membership(ph)
         nut_rendah, nut_sedang, nut_tinggi = self.nutrition_membership(nutrition)
         metal_rendah, metal_sedang, metal_tinggi = self.heavy_metal_membership(heavy_metal)
         org_rendah, org_sedang, org_tinggi = self.organic_matter_membership(organic_matter)
         
-        # Apply fuzzy rules
-        output_buruk, output_sedang, output_baik = self.apply_fuzzy_rules(
-            ph_asam, ph_normal, ph_basa,
-            nut_rendah, nut_sedang, nut_tinggi,
-            metal_rendah, metal_sedang, metal_tinggi,
-            org_rendah, org_sedang, org_tinggi
-        )
+        memberships = (ph_asam, ph_normal, ph_basa,
+                       nut_rendah, nut_sedang, nut_tinggi,
+                       metal_rendah, metal_sedang, metal_tinggi,
+                       org_rendah, org_sedang, org_tinggi)
+        if stats:
+            start = stats.record('main', 'fuzzification', start)
         
-        # Defuzzify to get crisp output
-        quality_score = self.defuzzify(output_buruk, output_sedang, output_baik)
+        # Apply fuzzy rules (see rules.RULES) and aggregate per output term
+        strengths = self.rule_base.firing_strengths_single(memberships)
+        if stats:
+            start = stats.record('main', 'rule_evaluation', start)
+        alphas = self.rule_base.aggregate_single(strengths)
+        if stats:
+            start = stats.record('main', 'aggregation', start)
+        
+        if self.defuzzification == 'analytic':
+            # Take the exact centroid of the clipped terms
+            quality_score = self.defuzzify_analytic(*alphas)
+        else:
+            # Defuzzify, clipping only the output terms that fired
+            quality_score = self._defuzzify_fired(*alphas)
+        if stats:
+            stats.record('main', 'defuzzification', start)
         
         # Determine quality category
         if quality_score < 40:
@@ -300,8 +426,264 @@ class FuzzyMamdaniSoilQuality:
             quality_category = "Baik"
         
         return quality_score, quality_category
+    
+    def _grid_step(self, universe_name):
+        """Spacing of a uniform universe, or None if the points are unevenly spaced"""
+        def build():
+            steps = np.diff(getattr(self, universe_name))
+            return float(steps[0]) if np.allclose(steps, steps[0]) else None
+        return self._cached(universe_name + ' step', build)
+    
+    def _lookup(self, universe_name, table, values):
+        """Membership degrees of `values` (scalar or array) in each term of `table`
+        
+        Uniform universes are indexed directly from the grid step, others with
+        a binary search, so the cost does not grow with universe resolution.
+        """
+        step = self._grid_step(universe_name)
+        if isinstance(values, (int, float, np.number)):
+            points = self._cached(universe_name + ' points', getattr(self, universe_name).tolist)
+            return self._lookup_scalar(points, step, table, float(values))
+        universe = getattr(self, universe_name)
+        values = np.asarray(values, dtype=float)
+        values = np.where(np.isnan(values), universe[0], np.clip(values, universe[0], universe[-1]))
+        last = len(universe) - 1
+        
+        if self.interpolate:
+            if step is not None:
+                left = np.floor((values - universe[0]) / step)
+            else:
+                left = np.searchsorted(universe, values, side='right') - 1.0
+            left = np.clip(left, 0, last - 1).astype(np.intp)
+            t = np.clip((values - universe[left]) / (universe[left + 1] - universe[left]), 0.0, 1.0)
+            return tuple(term[left] + t * (term[left + 1] - term[left]) for term in table)
+        
+        idx = self._nearest_indices(universe_name, values)
+        return tuple(term[idx] for term in table)
+    
+    def nearest_indices(self, universe_name, values):
+        """Index of the universe point each value is read at, without interpolation
+        
+        Out-of-range values map to the edges and NaN to the first point, as in
+        the membership lookups.
+        """
+        universe = getattr(self, universe_name)
+        values = np.asarray(values, dtype=float)
+        values = np.where(np.isnan(values), universe[0], np.clip(values, universe[0], universe[-1]))
+        return self._nearest_indices(universe_name, values)
+    
+    def _nearest_indices(self, universe_name, values):
+        """nearest_indices for values already clipped to the universe"""
+        universe = getattr(self, universe_name)
+        step = self._grid_step(universe_name)
+        last = len(universe) - 1
+        if step is not None:
+            idx = np.rint((values - universe[0]) / step)
+        else:
+            idx = np.searchsorted(universe, values)
+        idx = np.clip(idx, 0, last).astype(np.intp)
+        # Settle rounding at the cell edges the way argmin over the distances would:
+        # the closest point wins, and the lower one on a tie
+        lower, upper = np.maximum(idx - 1, 0), np.minimum(idx + 1, last)
+        distance = np.abs(universe[idx] - values)
+        return np.where(np.abs(universe[lower] - values) <= distance, lower,
+                        np.where(np.abs(universe[upper] - values) < distance, upper, idx))
+    
+    def _lookup_scalar(self, universe, step, table, value):
+        """Single-value version of _lookup on the universe as a list of Python floats"""
+        last = len(universe) - 1
+        # Out-of-range values read the edge of the universe, NaN the first point (as argmin did)
+        value = universe[0] if value != value else min(max(value, universe[0]), universe[last])
+        
+        if self.interpolate:
+            if step is not None:
+                left = min(int((value - universe[0]) // step), last - 1)
+            else:
+                left = min(max(bisect.bisect_right(universe, value) - 1, 0), last - 1)
+            t = min(max((value - universe[left]) / (universe[left + 1] - universe[left]), 0.0), 1.0)
+            return tuple(term[left] + t * (term[left + 1] - term[left]) for term in table)
+        
+        return tuple(term[self._nearest_index_scalar(universe, step, value)] for term in table)
+    
+    @staticmethod
+    def _nearest_index_scalar(universe, step, value):
+        """Index of the point of `universe` (a list) nearest to a value within its range, the lower one on a tie"""
+        last = len(universe) - 1
+        if step is not None:
+            idx = min(round((value - universe[0]) / step), last)
+        else:
+            idx = min(bisect.bisect_left(universe, value), last)
+        distance = abs(universe[idx] - value)
+        if idx > 0 and abs(universe[idx - 1] - value) <= distance:
+            idx -= 1
+        elif idx < last and abs(universe[idx + 1] - value) < distance:
+            idx += 1
+        return idx
+    
+    def _defuzzify_rows(self, alpha_buruk, alpha_sedang, alpha_baik):
+        """Discrete Center of Gravity for arrays of aggregated rule strengths, one row per sample
+        
+        Samples are grouped by which output terms fired, and each group clips
+        and combines only those terms in per-thread work arrays; samples where
+        nothing fired get 50.
+        """
+        terms = self.quality_membership_functions()
+        alphas = (alpha_buruk, alpha_sedang, alpha_baik)
+        signature = sum((alpha > 0).astype(np.intp) << k for k, alpha in enumerate(alphas))
+        scores = np.full(len(signature), 50.0)
+        groups = np.unique(signature[signature > 0])
+        if len(groups) == 0:
+            return scores
+        combined_rows, clipped_rows = self._work_arrays(np.bincount(signature).max())
+        for active in groups:
+            rows = np.flatnonzero(signature == active)
+            combined, clipped = combined_rows[:len(rows)], clipped_rows[:len(rows)]
+            first = True
+            for k, (alpha, term) in enumerate(zip(alphas, terms)):
+                if active >> k & 1:
+                    np.minimum(alpha[rows, None], term, out=combined if first else clipped)
+                    if not first:
+                        np.maximum(combined, clipped, out=combined)
+                    first = False
+            numerator = np.multiply(self.quality_range, combined, out=clipped).sum(axis=1)
+            denominator = combined.sum(axis=1)
+            fired = denominator != 0
+            scores[rows] = np.where(fired, numerator / np.where(fired, denominator, 1), 50.0)
+        return scores
+    
+    def evaluate_batch(self, ph, nutrition=None, heavy_metal=None, organic_matter=None, chunk_size=4096):
+        """Evaluate soil quality for many samples at once
+        
+        Takes four equal-length arrays, or a DataFrame with the data.csv columns
+        (pH, Nutrisi, Logam_Berat, Bahan_Organik) as the only argument.
+        Returns (scores, categories) arrays matching evaluate_soil_quality.
+        """
+        if nutrition is None:
+            df = ph
+            ph, nutrition = df['pH'], df['Nutrisi']
+            heavy_metal, organic_matter = df['Logam_Berat'], df['Bahan_Organik']
+        inputs = [np.asarray(v, dtype=float).ravel() for v in (ph, nutrition, heavy_metal, organic_matter)]
+        if len({len(v) for v in inputs}) != 1:
+            raise ValueError("All input arrays must have the same length")
+        
+        stats = profiling.active
+        start = stats and stats.now()
+        
+        # Fuzzify: look up every input in the membership tables of its universe
+        memberships = np.column_stack(self.ph_membership(inputs[0]) + self.nutrition_membership(inputs[1])
+                                      + self.heavy_metal_membership(inputs[2]) + self.organic_matter_membership(inputs[3]))
+        if stats:
+            stats.record('main', 'fuzzification', start, len(memberships))
+        
+        scores = self.evaluate_memberships(memberships, chunk_size)
+        categories = np.where(scores < 40, "Buruk", np.where(scores < 70, "Sedang", "Baik"))
+        return scores, categories
+    
+    def sweep(self, fixed=None, vary=None, chunk_size=4096):
+        """Scores on the grid spanned by `vary`, with the other variables held at `fixed`
+        
+        `vary` maps variables to 1-D arrays of values and `fixed` maps the
+        rest to scalars; together they must name ph, nutrition, heavy_metal and
+        organic_matter once each. Returns an array with one axis per varied
+        variable, in the order of `vary`, e.g.
+        
+            system.sweep(fixed={'nutrition': 180, 'organic_matter': 4},
+                         vary={'ph': np.linspace(4, 9, 101), 'heavy_metal': np.linspace(0, 30, 121)})
+        
+        has shape (101, 121). Every value is fuzzified once, and each distinct
+        combination of membership triples (neighbouring grid values often
+        share one) is scored once and then broadcast over the grid.
+        """
+        fixed = dict(fixed or {})
+        vary = {name: np.asarray(values, dtype=float).ravel() for name, values in (vary or {}).items()}
+        variables = ('ph', 'nutrition', 'heavy_metal', 'organic_matter')
+        if fixed.keys() & vary.keys() or sorted(fixed.keys() | vary.keys()) != sorted(variables):
+            raise ValueError(f"fixed and vary must name each of {', '.join(variables)} exactly once")
+        fuzzifiers = {'ph': self.ph_membership, 'nutrition': self.nutrition_membership,
+                      'heavy_metal': self.heavy_metal_membership, 'organic_matter': self.organic_matter_membership}
+        
+        # Distinct membership triples per variable, and which one every value uses
+        distinct, inverse = [], []
+        for name in variables:
+            values = vary[name] if name in vary else np.array([fixed[name]], dtype=float)
+            triples, index = np.unique(np.column_stack(fuzzifiers[name](values)), axis=0, return_inverse=True)
+            distinct.append(triples)
+            inverse.append(index.ravel())
+        
+        sizes = [len(triples) for triples in distinct]
+        grid = np.indices(sizes).reshape(len(sizes), -1)
+        memberships = np.column_stack([triples[i] for triples, i in zip(distinct, grid)])
+        scores = self.evaluate_memberships(memberships, chunk_size).reshape(sizes)[np.ix_(*inverse)]
+        
+        # Drop the fixed axes and put the varied ones in the order of `vary`
+        scores = scores.reshape([len(vary[name]) for name in variables if name in vary])
+        varied = [name for name in variables if name in vary]
+        return scores.transpose([varied.index(name) for name in vary])
+    
+    # Axis labels of the input variables in sweep plots
+    sweep_labels = {'ph': 'Nilai pH', 'nutrition': 'Nutrisi (mg/kg)',
+                    'heavy_metal': 'Logam Berat (mg/kg)', 'organic_matter': 'Bahan Organik (%)'}
+    
+    def sweep_figure(self, fixed, vary, path, title=None):
+        """Figure spec (see plotting.render) of a one- or two-variable sweep
+        
+        One varied variable gives a score curve, two give filled score
+        contours with the first variable on the x axis. The styling follows
+        the membership function plots.
+        """
+        if len(vary) not in (1, 2):
+            raise ValueError("A sweep plot varies one or two variables")
+        scores = self.sweep(fixed, vary)
+        names = list(vary)
+        if title is None:
+            title = 'Skor Kualitas Tanah (' + ', '.join(f"{self.sweep_labels[name].split(' (')[0]} = {value:g}"
+                                                        for name, value in fixed.items()) + ')'
+        panel = dict(title=(title, dict(fontsize=14, fontweight='bold', pad=15)),
+                     xlabel=(self.sweep_labels[names[0]], dict(fontsize=12)), legend_kw=dict(fontsize=10))
+        if len(names) == 1:
+            panel.update(curves=[(np.asarray(vary[names[0]], dtype=float), scores, 'Skor')], line_kw=dict(linewidth=2),
+                         ylabel=('Skor Kualitas', dict(fontsize=12)))
+        else:
+            x, y = (np.asarray(vary[name], dtype=float) for name in names)
+            panel.update(surface=(x, y, scores.T, dict(levels=np.linspace(0, 100, 21), extend='max', cmap='RdYlGn')),
+                         colorbar_label='Skor Kualitas', ylabel=(self.sweep_labels[names[1]], dict(fontsize=12)))
+        return dict(path=path, dpi=300, figsize=(10, 6), panels=[panel])
+    
+    def plot_sweep(self, fixed, vary, path, title=None):
+        """Render a sweep_figure to `path`, skipped when an identical plot is already there"""
+        import plotting
+        plotting.render_all([self.sweep_figure(fixed, vary, path, title)], workers=1)
+        return path
+    
+    def evaluate_memberships(self, memberships, chunk_size=4096):
+        """Scores for a (samples x 12) matrix of membership degrees in rule_base column order"""
+        # Fire the rules, aggregate and defuzzify in chunks to bound the per-sample work arrays
+        stats = profiling.active
+        scores = np.empty(len(memberships))
+        for offset in range(0, len(scores), chunk_size):
+            chunk = slice(offset, offset + chunk_size)
+            start = stats and stats.now()
+            strengths = self.rule_base.firing_strengths(memberships[chunk])
+            if stats:
+                start = stats.record('main', 'rule_evaluation', start, len(strengths))
+            alphas = self.rule_base.aggregate(strengths)
+            if stats:
+                start = stats.record('main', 'aggregation', start, len(strengths))
+            scores[chunk] = self.defuzzify_batch(*alphas.T)
+            if stats:
+                stats.record('main', 'defuzzification', start, len(strengths))
+        return scores
+    
+    def defuzzify_batch(self, alpha_buruk, alpha_sedang, alpha_baik):
+        """Crisp scores for arrays of aggregated rule strengths, with the configured method"""
+        if self.defuzzification == 'analytic':
+            return self.defuzzify_analytic(alpha_buruk, alpha_sedang, alpha_baik)
+        return self._defuzzify_rows(alpha_buruk, alpha_sedang, alpha_baik)
 
 def main():
+    # pandas is only needed to read the CSV, so scoring-only imports of this module skip it
+    import pandas as pd
+    
     # Create fuzzy system
     fuzzy_system = FuzzyMamdaniSoilQuality()
     
@@ -313,17 +695,12 @@ def main():
         print("No | pH | Nutrisi | Logam Berat | Bahan Organik | Skor | Kualitas")
         print("-" * 60)
         
-        for index, row in df.iterrows():
-            ph = row['pH']
-            nutrition = row['Nutrisi']
-            heavy_metal = row['Logam_Berat']
-            organic_matter = row['Bahan_Organik']
-            case_num = row['No']
-            
-            quality_score, quality_category = fuzzy_system.evaluate_soil_quality(
-                ph, nutrition, heavy_metal, organic_matter
-            )
-            
+        scores, categories = fuzzy_system.evaluate_batch(df)
+        
+        for case_num, ph, nutrition, heavy_metal, organic_matter, quality_score, quality_category in zip(
+            # No as float, as iterrows gave it on these all-numeric rows (prints 1.0, 2.0, ...)
+            df['No'].astype(float), df['pH'], df['Nutrisi'], df['Logam_Berat'], df['Bahan_Organik'], scores, categories
+        ):
             print(f"{case_num:2} | {ph:4.1f} | {nutrition:7.0f} | {heavy_metal:11.0f} | {organic_matter:14.0f} | {quality_score:4.1f} | {quality_category}")
         
         print("=" * 60)
@@ -1,61 +1,80 @@
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
+from cache import DEFAULT_STEPS, ResultCache
+import plotting
+from rules import RULE_BASE
+from scenario import Scenario
+
+# Optional ResultCache in front of evaluate() for scalar inputs, see enable_result_cache
+result_cache = None
 
 def trimf(x, a, b, c):
-    """Triangular membership function"""
-    if x <= a or x >= c: return 0
-    if x < b: return (x - a) / (b - a)
-    return (c - x) / (c - b)
+    """Triangular membership function, for a scalar or an array of x"""
+    if np.ndim(x) == 0:
+        if x <= a or x >= c: return 0
+        if x < b: return (x - a) / (b - a)
+        return (c - x) / (c - b)
+
+    # Same branches as the scalar case, so shoulders (a == b or b == c) match exactly
+    x = np.asarray(x, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = np.where(x < b, (x - a) / (b - a), (c - x) / (c - b))
+    return np.where((x <= a) | (x >= c), 0.0, y)
 
 def trapmf(x, a, b, c, d):
-    """Trapezoidal membership function"""
-    if x <= a or x >= d: return 0
-    if x < b: return (x - a) / (b - a)
-    if x <= c: return 1
-    return (d - x) / (d - c)
+    """Trapezoidal membership function, for a scalar or an array of x"""
+    if np.ndim(x) == 0:
+        if x <= a or x >= d: return 0
+        if x < b: return (x - a) / (b - a)
+        if x <= c: return 1
+        return (d - x) / (d - c)
 
-def fuzzify(ph, nutrition, heavy_metal, organic_matter):
-    """Fuzzification - calculate membership degrees"""
-    return {
-        'ph': {
-            'asam': trapmf(ph, 4, 4, 5.5, 6.0),
-            'normal': trimf(ph, 5.5, 6.5, 7.5),
-            'basa': trapmf(ph, 6.5, 7.0, 9, 9)
-        },
-        'nutrition': {
-            'rendah': trimf(nutrition, 0, 0, 150),
-            'sedang': trimf(nutrition, 50, 150, 250),
-            'tinggi': trimf(nutrition, 150, 350, 350)
-        },
-        'heavy_metal': {
-            'rendah': trimf(heavy_metal, 0, 0, 15),
-            'sedang': trimf(heavy_metal, 5, 15, 25),
-            'tinggi': trimf(heavy_metal, 15, 30, 30)
-        },
-        'organic_matter': {
-            'rendah': trimf(organic_matter, 0, 0, 3),
-            'sedang': trimf(organic_matter, 1, 3.5, 6),
-            'tinggi': trimf(organic_matter, 4, 10, 10)
-        }
+    x = np.asarray(x, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = np.where(x < b, (x - a) / (b - a), np.where(x <= c, 1.0, (d - x) / (d - c)))
+    return np.where((x <= a) | (x >= d), 0.0, y)
+
+# Membership functions of every variable's terms as (function, parameters)
+MEMBERSHIP_FUNCTIONS = {
+    'ph': {
+        'asam': (trapmf, (4, 4, 5.5, 6.0)),
+        'normal': (trimf, (5.5, 6.5, 7.5)),
+        'basa': (trapmf, (6.5, 7.0, 9, 9))
+    },
+    'nutrition': {
+        'rendah': (trimf, (0, 0, 150)),
+        'sedang': (trimf, (50, 150, 250)),
+        'tinggi': (trimf, (150, 350, 350))
+    },
+    'heavy_metal': {
+        'rendah': (trimf, (0, 0, 15)),
+        'sedang': (trimf, (5, 15, 25)),
+        'tinggi': (trimf, (15, 30, 30))
+    },
+    'organic_matter': {
+        'rendah': (trimf, (0, 0, 3)),
+        'sedang': (trimf, (1, 3.5, 6)),
+        'tinggi': (trimf, (4, 10, 10))
     }
+}
+
+def fuzzify_variable(variable, value):
+    """Membership degrees of one variable's value (scalar or array) in each of its terms"""
+    return {term: function(value, *params) for term, (function, params) in MEMBERSHIP_FUNCTIONS[variable].items()}
+
+def fuzzify(ph, nutrition, heavy_metal, organic_matter):
+    """Fuzzification - calculate membership degrees (scalars, or arrays of equal length)"""
+    return {variable: fuzzify_variable(variable, value)
+            for variable, value in zip(MEMBERSHIP_FUNCTIONS, (ph, nutrition, heavy_metal, organic_matter))}
 
 def inference(md):
-    """Inference - apply fuzzy rules"""
-    rules = [
-        min(md['ph']['normal'], md['nutrition']['tinggi'], md['heavy_metal']['rendah']),  # R1: baik
-        min(max(md['ph']['asam'], md['ph']['basa']), md['nutrition']['rendah'], md['heavy_metal']['tinggi']),  # R2: buruk
-        min(md['ph']['normal'], md['nutrition']['sedang'], md['heavy_metal']['sedang']),  # R3: sedang
-        md['organic_matter']['tinggi'],  # R4: baik
-        min(md['organic_matter']['rendah'], md['heavy_metal']['tinggi']),  # R5: buruk
-        min(md['ph']['normal'], md['nutrition']['tinggi'], md['heavy_metal']['sedang'])  # R6: sedang
-    ]
-    return {
-        'buruk': max(rules[1], rules[4]),
-        'sedang': max(rules[2], rules[5]),
-        'baik': max(rules[0], rules[3])
-    }
+    """Inference - apply fuzzy rules (see rules.RULES); column-wise for array memberships"""
+    memberships = RULE_BASE.flatten(md)
+    if np.ndim(memberships[0]) == 0:
+        alphas = RULE_BASE.alphas_single(memberships)
+        return dict(zip(RULE_BASE.output_terms, alphas))
+    alphas = RULE_BASE.alphas(np.column_stack(np.broadcast_arrays(*memberships)))
+    return dict(zip(RULE_BASE.output_terms, alphas.T))
 
 def defuzzify(alpha):
     """Defuzzification using centroid method"""
@@ -65,116 +84,121 @@ def defuzzify(alpha):
     numerator = sum(alpha[k] * centroids[k] for k in alpha)
     denominator = sum(alpha.values())
     
-    return numerator / denominator if denominator > 0 else 50
+    if np.ndim(denominator) == 0:
+        return numerator / denominator if denominator > 0 else 50
+    return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), 50.0)
+
+def enable_result_cache(maxsize=100_000, steps=DEFAULT_STEPS):
+    """Put a fresh LRU cache in front of evaluate() and return it"""
+    global result_cache
+    result_cache = ResultCache(maxsize, steps)
+    return result_cache
 
 def evaluate(ph, nutrition, heavy_metal, organic_matter):
-    """Complete fuzzy evaluation"""
+    """Complete fuzzy evaluation; arrays of inputs give arrays of scores and categories"""
+    if result_cache is not None and np.ndim(ph) == 0:
+        return result_cache.get((ph, nutrition, heavy_metal, organic_matter), _evaluate)
+    return _evaluate(ph, nutrition, heavy_metal, organic_matter)
+
+def _evaluate(ph, nutrition, heavy_metal, organic_matter):
+    """Evaluation without the result cache"""
     md = fuzzify(ph, nutrition, heavy_metal, organic_matter)
     alpha = inference(md)
     score = defuzzify(alpha)
     
-    category = "Buruk" if score < 40 else "Sedang" if score < 70 else "Baik"
+    if np.ndim(score) == 0:
+        category = "Buruk" if score < 40 else "Sedang" if score < 70 else "Baik"
+    else:
+        category = np.where(score < 40, "Buruk", np.where(score < 70, "Sedang", "Baik"))
     return score, category
 
-def plot_membership_functions():
-    """Plot dan simpan gambar membership functions"""
-    plt.ioff()
+def scenario(ph, nutrition, heavy_metal, organic_matter):
+    """Scenario for one sample, re-scored after updating single inputs (see scenario.Scenario)"""
+    fuzzifiers = {variable: (lambda value, variable=variable: tuple(fuzzify_variable(variable, value).values()))
+                  for variable in MEMBERSHIP_FUNCTIONS}
+    defuzzify_alphas = lambda alphas: defuzzify(dict(zip(RULE_BASE.output_terms, alphas)))
+    return Scenario(fuzzifiers, defuzzify_alphas, (ph, nutrition, heavy_metal, organic_matter))
+
+def plot_membership_functions(workers=None):
+    """Plot dan simpan gambar membership functions; gambar yang isinya tidak berubah dilewati"""
     
     # Parameter membership functions
     mf_params = [
         {
             'name': 'pH', 'range': (4, 9), 'mfs': [
-                ('Asam', lambda x: [trapmf(xi, 4, 4, 5.5, 6.0) for xi in x]),
-                ('Normal', lambda x: [trimf(xi, 5.5, 6.5, 7.5) for xi in x]),
-                ('Basa', lambda x: [trapmf(xi, 6.5, 7.0, 9, 9) for xi in x])
+                ('Asam', lambda x: trapmf(x, 4, 4, 5.5, 6.0)),
+                ('Normal', lambda x: trimf(x, 5.5, 6.5, 7.5)),
+                ('Basa', lambda x: trapmf(x, 6.5, 7.0, 9, 9))
             ], 'title': 'pH Tanah', 'xlabel': 'Nilai pH', 'filename': 'ph_membership'
         },
         {
             'name': 'Nutrition', 'range': (0, 350), 'mfs': [
-                ('Rendah', lambda x: [trimf(xi, 0, 0, 150) for xi in x]),
-                ('Sedang', lambda x: [trimf(xi, 50, 150, 250) for xi in x]),
-                ('Tinggi', lambda x: [trimf(xi, 150, 350, 350) for xi in x])
+                ('Rendah', lambda x: trimf(x, 0, 0, 150)),
+                ('Sedang', lambda x: trimf(x, 50, 150, 250)),
+                ('Tinggi', lambda x: trimf(x, 150, 350, 350))
             ], 'title': 'Nutrisi', 'xlabel': 'Nutrisi (mg/kg)', 'filename': 'nutrition_membership'
         },
         {
             'name': 'Heavy Metal', 'range': (0, 30), 'mfs': [
-                ('Rendah', lambda x: [trimf(xi, 0, 0, 15) for xi in x]),
-                ('Sedang', lambda x: [trimf(xi, 5, 15, 25) for xi in x]),
-                ('Tinggi', lambda x: [trimf(xi, 15, 30, 30) for xi in x])
+                ('Rendah', lambda x: trimf(x, 0, 0, 15)),
+                ('Sedang', lambda x: trimf(x, 5, 15, 25)),
+                ('Tinggi', lambda x: trimf(x, 15, 30, 30))
             ], 'title': 'Logam Berat', 'xlabel': 'Logam Berat (mg/kg)', 'filename': 'heavy_metal_membership'
         },
         {
             'name': 'Organic Matter', 'range': (0, 10), 'mfs': [
-                ('Rendah', lambda x: [trimf(xi, 0, 0, 3) for xi in x]),
-                ('Sedang', lambda x: [trimf(xi, 1, 3.5, 6) for xi in x]),
-                ('Tinggi', lambda x: [trimf(xi, 4, 10, 10) for xi in x])
+                ('Rendah', lambda x: trimf(x, 0, 0, 3)),
+                ('Sedang', lambda x: trimf(x, 1, 3.5, 6)),
+                ('Tinggi', lambda x: trimf(x, 4, 10, 10))
             ], 'title': 'Bahan Organik', 'xlabel': 'Bahan Organik (%)', 'filename': 'organic_matter_membership'
         },
         {
             'name': 'Quality', 'range': (0, 100), 'mfs': [
-                ('Buruk', lambda x: [trimf(xi, 0, 0, 50) for xi in x]),
-                ('Sedang', lambda x: [trimf(xi, 20, 50, 80) for xi in x]),
-                ('Baik', lambda x: [trimf(xi, 50, 100, 100) for xi in x])
+                ('Buruk', lambda x: trimf(x, 0, 0, 50)),
+                ('Sedang', lambda x: trimf(x, 20, 50, 80)),
+                ('Baik', lambda x: trimf(x, 50, 100, 100))
             ], 'title': 'Kualitas Tanah', 'xlabel': 'Skor Kualitas', 'filename': 'quality_membership'
         }
     ]
     
-    # Plot individual membership functions
+    # Curves are computed once and shared by the individual and summary plots
     for param in mf_params:
         x = np.linspace(param['range'][0], param['range'][1], 1000)
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        for label, mf_func in param['mfs']:
-            y = mf_func(x)
-            ax.plot(x, y, label=label, linewidth=2)
-        
-        ax.set_title(param['title'], fontsize=14, fontweight='bold')
-        ax.set_xlabel(param['xlabel'], fontsize=12)
-        ax.set_ylabel('Derajat Keanggotaan', fontsize=12)
-        ax.grid(True, alpha=0.3)
-        ax.legend(fontsize=10)
-        plt.tight_layout()
-        plt.savefig(f"output/manual/{param['filename']}.png", dpi=300, bbox_inches='tight')
-        plt.close()
+        param['curves'] = [(x, mf_func(x), label) for label, mf_func in param['mfs']]
     
-    # Plot summary
-    fig, axes = plt.subplots(2, 3, figsize=(15, 10))
-    fig.suptitle('Sistem Fuzzy Mamdani - Evaluasi Kualitas Tanah (Manual)', fontsize=16, fontweight='bold')
-    
-    for i, param in enumerate(mf_params):
-        row, col = i // 3, i % 3
-        x = np.linspace(param['range'][0], param['range'][1], 1000)
-        
-        for label, mf_func in param['mfs']:
-            y = mf_func(x)
-            axes[row, col].plot(x, y, label=label, linewidth=2)
-        
-        axes[row, col].set_title(param['title'], fontsize=12, fontweight='bold')
-        axes[row, col].grid(True, alpha=0.3)
-        axes[row, col].legend(fontsize=8)
+    # Plot individual membership functions
+    figures = [{
+        'path': f"output/manual/{param['filename']}.png", 'dpi': 300, 'figsize': (10, 6),
+        'panels': [{
+            'curves': param['curves'], 'line_kw': {'linewidth': 2}, 'legend_kw': {'fontsize': 10},
+            'title': (param['title'], {'fontsize': 14, 'fontweight': 'bold'}),
+            'xlabel': (param['xlabel'], {'fontsize': 12}),
+            'ylabel': ('Derajat Keanggotaan', {'fontsize': 12}),
+        }],
+    } for param in mf_params]
     
-    # Add rules info
-    axes[1, 2].axis('off')
-    axes[1, 2].text(0.1, 0.5, 
-                   'Aturan Fuzzy:\n\n'
-                   '1. pH Normal ∧ Nutrisi Tinggi ∧ Logam Rendah → Baik\n'
-                   '2. pH (Asam ∨ Basa) ∧ Nutrisi Rendah ∧ Logam Tinggi → Buruk\n'
-                   '3. pH Normal ∧ Nutrisi Sedang ∧ Logam Sedang → Sedang\n'
-                   '4. Bahan Organik Tinggi → Baik\n'
-                   '5. Bahan Organik Rendah ∧ Logam Tinggi → Buruk\n'
-                   '6. pH Normal ∧ Nutrisi Tinggi ∧ Logam Sedang → Sedang\n\n'
-                   'Implementasi Manual\n'
-                   'Agil Ghani Istikmal (5220411040)',
-                   fontsize=10, transform=axes[1, 2].transAxes,
-                   bbox=dict(boxstyle="round,pad=0.5", facecolor="lightblue", alpha=0.7))
+    # Plot summary, with the rules info in the last panel
+    figures.append({
+        'path': 'output/manual/all_membership_functions.png', 'dpi': 300, 'figsize': (15, 10), 'layout': (2, 3),
+        'suptitle': ('Sistem Fuzzy Mamdani - Evaluasi Kualitas Tanah (Manual)', {'fontsize': 16, 'fontweight': 'bold'}),
+        'panels': [{
+            'curves': param['curves'], 'line_kw': {'linewidth': 2}, 'legend_kw': {'fontsize': 8},
+            'title': (param['title'], {'fontsize': 12, 'fontweight': 'bold'}),
+        } for param in mf_params],
+        'note': (5, 'Aturan Fuzzy:\n\n'
+                 + ''.join(f'{i + 1}. {RULE_BASE.describe(i, title=True)}\n' for i in range(len(RULE_BASE.rules)))
+                 + '\nImplementasi Manual\n'
+                 'Agil Ghani Istikmal (5220411040)',
+                 {'fontsize': 10, 'bbox': dict(boxstyle="round,pad=0.5", facecolor="lightblue", alpha=0.7)}),
+    })
     
-    plt.tight_layout()
-    plt.savefig('output/manual/all_membership_functions.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    plotting.render_all(figures, workers)
     
     print("Gambar membership functions berhasil disimpan di output/manual/")
 
 def main():
+    import pandas as pd
+    
     print("SISTEM FUZZY MAMDANI - EVALUASI KUALITAS TANAH")
     print("Implementasi Manual (Tanpa Library)")
     print()
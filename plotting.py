@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Bump when render() changes how a figure is drawn, so every cached plot is redrawn
+RENDER_VERSION = 1
+
+# Per-directory record of the content hash each PNG was last rendered from
+MANIFEST = '.plot_hashes.json'
+
+def _update_digest(digest, value):
+    if isinstance(value, np.ndarray):
+        digest.update(f"array{value.dtype.str}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b'dict')
+        for key in sorted(value):
+            _update_digest(digest, key)
+            _update_digest(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"seq{len(value)}".encode())
+        for item in value:
+            _update_digest(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+def content_hash(figure):
+    """Hash of everything that determines a figure's pixels"""
+    digest = hashlib.sha256(f"v{RENDER_VERSION}".encode())
+    _update_digest(digest, figure)
+    return digest.hexdigest()
+
+def render(figure):
+    """Draw one figure spec and save it as a PNG
+
+    A figure is a dict with path, dpi and figsize, an optional layout
+    (rows, cols) and suptitle, a list of panels drawn into the axes in
+    order, and an optional note panel that shows only text. Each panel has
+    curves [(x, y, label)], line_kw, an optional vline (value, kwargs),
+    title/xlabel/ylabel as (text, kwargs) or None, and legend_kw. A panel
+    may instead hold a surface (x, y, z, kwargs), drawn as filled contours
+    of z (shaped len(y) x len(x)) with a colorbar labelled colorbar_label.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.ioff()
+
+    if figure.get('layout'):
+        fig, axes = plt.subplots(*figure['layout'], figsize=figure['figsize'])
+        axes = axes.ravel()
+    else:
+        fig, ax = plt.subplots(figsize=figure['figsize'])
+        axes = [ax]
+    if figure.get('suptitle'):
+        text, kwargs = figure['suptitle']
+        fig.suptitle(text, **kwargs)
+
+    for ax, panel in zip(axes, figure['panels']):
+        if panel.get('surface') is not None:
+            x, y, z, kwargs = panel['surface']
+            contours = ax.contourf(x, y, z, **kwargs)
+            fig.colorbar(contours, ax=ax, label=panel.get('colorbar_label'))
+        for x, y, label in panel.get('curves', ()):
+            ax.plot(x, y, label=label, **panel.get('line_kw', {}))
+        if panel.get('vline') is not None:
+            value, kwargs = panel['vline']
+            ax.axvline(value, **kwargs)
+        for setter, key in ((ax.set_title, 'title'), (ax.set_xlabel, 'xlabel'), (ax.set_ylabel, 'ylabel')):
+            if panel.get(key) is not None:
+                text, kwargs = panel[key]
+                setter(text, **kwargs)
+        ax.grid(True, alpha=0.3)
+        if panel.get('curves'):
+            ax.legend(**panel.get('legend_kw', {}))
+
+    if figure.get('note'):
+        index, text, kwargs = figure['note']
+        axes[index].axis('off')
+        axes[index].text(0.1, 0.5, text, transform=axes[index].transAxes, **kwargs)
+
+    plt.tight_layout()
+    plt.savefig(figure['path'], dpi=figure['dpi'], bbox_inches='tight')
+    plt.close(fig)
+    return figure['path']
+
+def _read_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def render_all(figures, workers=None, force=False):
+    """Render the figures whose content changed, on a process pool
+
+    A figure is skipped when its PNG exists and the manifest in its folder
+    records the same content hash. Missing folders are created. With one
+    worker, or a single stale figure, rendering stays in this process.
+    Returns (rendered, skipped) counts.
+    """
+    manifests = {}
+    stale = []
+    for figure in figures:
+        folder, name = os.path.split(figure['path'])
+        if folder not in manifests:
+            os.makedirs(folder or '.', exist_ok=True)
+            manifests[folder] = _read_manifest(folder)
+        digest = content_hash(figure)
+        if force or manifests[folder].get(name) != digest or not os.path.exists(figure['path']):
+            stale.append((figure, folder, name, digest))
+
+    workers = workers or os.cpu_count()
+    if workers == 1 or len(stale) <= 1:
+        for figure, *_ in stale:
+            render(figure)
+    else:
+        with ProcessPoolExecutor(min(workers, len(stale))) as pool:
+            list(pool.map(render, [figure for figure, *_ in stale]))
+
+    for figure, folder, name, digest in stale:
+        manifests[folder][name] = digest
+    for folder in {folder for _, folder, _, _ in stale}:
+        with open(os.path.join(folder, MANIFEST), 'w') as f:
+            json.dump(manifests[folder], f, indent=1, sort_keys=True)
+    return len(stale), len(figures) - len(stale)
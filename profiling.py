@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+class StageStats:
+    """Wall time, call count and sample count per (implementation, stage)
+
+    Stages are recorded by the evaluate paths while the stats are active (see
+    profile()). A stage timed on a batch counts one call and len(batch)
+    samples. Safe to share between threads.
+    """
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    now = staticmethod(time.perf_counter)
+
+    def record(self, implementation, stage, start, samples=1):
+        """Add the time since `start` to a stage and return the current time for the next one"""
+        end = time.perf_counter()
+        with self._lock:
+            entry = self.stages.get((implementation, stage))
+            if entry is None:
+                entry = self.stages[implementation, stage] = [0, 0, 0.0]
+            entry[0] += 1
+            entry[1] += samples
+            entry[2] += end - start
+        return end
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+
+    def to_dict(self):
+        """{implementation: {stage: {calls, samples, seconds, seconds_per_sample}}}"""
+        with self._lock:
+            result = {}
+            for (implementation, stage), (calls, samples, seconds) in self.stages.items():
+                result.setdefault(implementation, {})[stage] = {
+                    'calls': calls, 'samples': samples, 'seconds': seconds,
+                    'seconds_per_sample': seconds / samples if samples else 0.0,
+                }
+            return result
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix='soil_fuzzy'):
+        """Prometheus text exposition format, one counter family per measure"""
+        with self._lock:
+            stages = sorted(self.stages.items())
+        lines = []
+        for index, (name, help_text) in enumerate([('calls', 'Timed stage executions'),
+                                                   ('samples', 'Samples processed by the stage'),
+                                                   ('seconds', 'Wall time spent in the stage')]):
+            metric = f"{prefix}_stage_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (implementation, stage), values in stages:
+                lines.append(f'{metric}{{implementation="{implementation}",stage="{stage}"}} {values[index]}')
+        return '\n'.join(lines) + '\n'
+
+# Stats the evaluate paths record into, or None when instrumentation is off. The
+# hot paths read this once per call and skip all timing when it is None.
+active = None
+
+def enable(stats=None):
+    """Start recording into `stats` (a new StageStats by default) and return it"""
+    global active
+    active = stats if stats is not None else StageStats()
+    return active
+
+def disable():
+    global active
+    active = None
+
+@contextmanager
+def profile(stats=None):
+    """Record stage timings for the duration of a with block
+
+        with profiling.profile() as stats:
+            system.evaluate_batch(df)
+        print(stats.to_json(indent=2))
+    """
+    global active
+    previous = active
+    stats = enable(stats)
+    try:
+        yield stats
+    finally:
+        active = previous
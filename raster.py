@@ -0,0 +1,139 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from numpy.lib.format import open_memmap
+import batch
+
+# Category raster value of pixels with nodata in any layer; valid pixels hold codes into batch.CATEGORIES
+CATEGORY_NODATA = 255
+
+def open_layer(path, shape=None, dtype='float32'):
+    """Read-only memory map of one 2-D layer: a .npy file, or raw binary (e.g. ENVI .bil/.flt) of `shape`"""
+    if path.lower().endswith('.npy'):
+        layer = np.load(path, mmap_mode='r')
+    elif shape is None:
+        raise ValueError(f"Raw layer {path!r} needs a shape (rows, cols)")
+    else:
+        layer = np.memmap(path, dtype=dtype, mode='r', shape=tuple(shape))
+    if layer.ndim != 2:
+        raise ValueError(f"Layer {path!r} must be 2-D, got shape {layer.shape}")
+    return layer
+
+def tiles(shape, tile_size):
+    """(row slice, column slice) of every tile of a raster, in row-major order"""
+    rows, cols = shape
+    return [(slice(r, min(r + tile_size, rows)), slice(c, min(c + tile_size, cols)))
+            for r in range(0, rows, tile_size) for c in range(0, cols, tile_size)]
+
+# Layers, outputs and scorer of the current process, opened once by _init_worker
+_state = None
+
+def _init_worker(layer_paths, score_path, category_path, nodata, shape, dtype, model, control_surface, lookup_table):
+    global _state
+    _state = {
+        'layers': [open_layer(path, shape, dtype) for path in layer_paths],
+        'score': np.load(score_path, mmap_mode='r+'),
+        'category': np.load(category_path, mmap_mode='r+'),
+        'nodata': nodata,
+        'scorer': batch.make_scorer(model, control_surface, lookup_table),
+    }
+
+def _score_tile(tile):
+    """Score one tile of the layers into the output rasters; returns its number of valid pixels"""
+    rows, cols = tile
+    layers = [layer[rows, cols] for layer in _state['layers']]
+    valid = np.ones(layers[0].shape, dtype=bool)
+    for values, nodata in zip(layers, _state['nodata']):
+        valid &= np.isfinite(values)
+        if nodata is not None:
+            valid &= values != nodata
+
+    score = np.full(valid.shape, np.nan, dtype=np.float32)
+    category = np.full(valid.shape, CATEGORY_NODATA, dtype=np.uint8)
+    if valid.any():
+        # Only the valid pixels are scored, as one flat chunk like a batch.py chunk
+        scores, categories = _state['scorer'](dict(zip(batch.INPUT_COLUMNS, (values[valid] for values in layers))))
+        compact = batch.compact_columns({'Skor': scores, 'Kualitas': categories})
+        score[valid] = compact['Skor']
+        category[valid] = compact['Kualitas']
+    _state['score'][rows, cols] = score
+    _state['category'][rows, cols] = category
+    return int(valid.sum())
+
+def score_raster(layer_paths, score_path, category_path, model='main', tile_size=512, workers=None, nodata=None,
+                 shape=None, dtype='float32', control_surface=None, lookup_table=None):
+    """Score four co-registered layers (pH, Nutrisi, Logam_Berat, Bahan_Organik) tile by tile
+
+    The layers are memory-mapped and never loaded whole. The outputs are
+    .npy rasters of the same shape, created up front and memory-mapped: a
+    float32 score raster (NaN for nodata) and a uint8 category raster
+    (codes into batch.CATEGORIES, CATEGORY_NODATA for nodata). A pixel is
+    nodata when any layer holds a non-finite value or its `nodata` value
+    (one value for all layers or one per layer). Tiles are scored on a
+    process pool whose workers write their tiles into the outputs
+    themselves, so memory depends on tile_size and workers only.
+    Returns (pixels, valid pixels, seconds).
+    """
+    start = time.perf_counter()
+    if len(layer_paths) != len(batch.INPUT_COLUMNS):
+        raise ValueError(f"Expected {len(batch.INPUT_COLUMNS)} layers ({', '.join(batch.INPUT_COLUMNS)}), "
+                         f"got {len(layer_paths)}")
+    shapes = {open_layer(path, shape, dtype).shape for path in layer_paths}
+    if len(shapes) != 1:
+        raise ValueError(f"All layers must have the same shape, got {sorted(shapes)}")
+    raster_shape = shapes.pop()
+    nodata = list(nodata) if isinstance(nodata, (list, tuple)) else [nodata] * len(layer_paths)
+    if len(nodata) != len(layer_paths):
+        raise ValueError("nodata must be one value or one value per layer")
+
+    # Created here and reopened by every worker, which writes its tiles in place
+    open_memmap(score_path, mode='w+', dtype=np.float32, shape=raster_shape).flush()
+    open_memmap(category_path, mode='w+', dtype=np.uint8, shape=raster_shape).flush()
+
+    initargs = (list(layer_paths), score_path, category_path, nodata, shape, dtype, model, control_surface,
+                lookup_table)
+    workers = workers or os.cpu_count()
+    todo = tiles(raster_shape, tile_size)
+    if workers == 1:
+        _init_worker(*initargs)
+        valid = sum(_score_tile(tile) for tile in todo)
+        _state['score'].flush()
+        _state['category'].flush()
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as pool:
+            valid = sum(pool.map(_score_tile, todo))
+    return raster_shape[0] * raster_shape[1], valid, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluasi kualitas tanah untuk raster grid per tile dengan memory map")
+    parser.add_argument('ph', help="layer pH (.npy 2-D atau biner mentah dengan --shape)")
+    parser.add_argument('nutrition', help="layer Nutrisi")
+    parser.add_argument('heavy_metal', help="layer Logam_Berat")
+    parser.add_argument('organic_matter', help="layer Bahan_Organik")
+    parser.add_argument('--score', default='skor.npy', help="raster skor float32 (.npy), NaN untuk nodata")
+    parser.add_argument('--category', default='kualitas.npy',
+                        help=f"raster kategori uint8 (.npy): 0=Buruk, 1=Sedang, 2=Baik, {CATEGORY_NODATA}=nodata")
+    parser.add_argument('--model', choices=['main', 'manual', 'withlib', 'lut'], default='main')
+    parser.add_argument('--tile-size', type=int, default=512, help="sisi tile dalam piksel")
+    parser.add_argument('--workers', type=int, default=None, help="jumlah proses (default: jumlah core)")
+    parser.add_argument('--nodata', type=float, nargs='+', default=None,
+                        help="nilai nodata, satu untuk semua layer atau satu per layer (NaN selalu nodata)")
+    parser.add_argument('--shape', type=int, nargs=2, default=None, metavar=('BARIS', 'KOLOM'),
+                        help="ukuran layer biner mentah")
+    parser.add_argument('--dtype', default='float32', help="tipe data layer biner mentah")
+    parser.add_argument('--control-surface', default=None, help="file .npz ControlSurface untuk model withlib")
+    parser.add_argument('--lookup-table', default=None, help="tabel .npy dari lut.py untuk model lut")
+    args = parser.parse_args()
+
+    nodata = args.nodata[0] if args.nodata and len(args.nodata) == 1 else args.nodata
+    pixels, valid, elapsed = score_raster([args.ph, args.nutrition, args.heavy_metal, args.organic_matter],
+                                          args.score, args.category, args.model, args.tile_size, args.workers,
+                                          nodata, args.shape, args.dtype, args.control_surface, args.lookup_table)
+    print(f"{pixels} piksel ({valid} valid) dievaluasi dalam {elapsed:.2f} detik "
+          f"({pixels / max(elapsed, 1e-9):,.0f} piksel/detik)")
+    print(f"Skor tersimpan di {args.score}, kategori di {args.category}")
+
+if __name__ == "__main__":
+    main()
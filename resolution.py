@@ -0,0 +1,162 @@
+import argparse
+import contextlib
+import json
+import os
+import time
+import numpy as np
+from benchmark import DISTRIBUTIONS, random_inputs
+from main import FuzzyMamdaniSoilQuality
+from withlib import FuzzySoilQuality
+
+MODELS = {'main': FuzzyMamdaniSoilQuality, 'withlib': FuzzySoilQuality}
+
+# Grid steps tried per variable when none are given
+DEFAULT_STEPS = {
+    'ph': [0.01, 0.02, 0.05, 0.1, 0.2, 0.5],
+    'nutrition': [0.5, 1, 2, 5, 10],
+    'heavy_metal': [0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1],
+    'organic_matter': [0.01, 0.02, 0.05, 0.1, 0.2, 0.5],
+    'quality': [0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2],
+}
+
+def _scorer(model, resolution=None, **kwargs):
+    """Scores for an (n x 4) matrix from a system of `model` built with `resolution` and kwargs
+
+    withlib runs without skfuzzy's result cache, which would otherwise
+    answer the repeated timing runs.
+    """
+    if model == 'withlib':
+        kwargs.setdefault('simulation_cache', False)
+    system = MODELS[model](resolution=resolution, **kwargs)
+    if model == 'main':
+        return lambda X: system.evaluate_batch(*X.T)[0]
+    return lambda X: np.array([system.evaluate(*row)[0] for row in X.tolist()])
+
+def _timed(scorer, X, repeats):
+    """Scores and the best wall time of `repeats` runs"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scores = scorer(X)
+        best = min(best, time.perf_counter() - start)
+    return scores, best
+
+def sweep_resolution(model='main', variables=None, steps=None, X=None, reference='analytic', repeats=3):
+    """Score error and evaluation time of `model` for every grid step of every variable
+
+    Only the swept variable's universe changes; the others keep their
+    defaults. Errors are measured against the model at the smallest step
+    tried for the variable, with analytic defuzzification (the limit the
+    discrete centroid converges to) for reference='analytic' or the default
+    discrete one for 'finest'. Sweeping quality against 'analytic' compares
+    with the default quality universe, since the analytic centroid does not
+    sample it. Every system is built exactly as the constructor builds it:
+    for main a swept nutrition grid is real-valued at every step, while the
+    other sweeps keep the default integer nutrition grid (see
+    integer_nutrition_error).
+    Returns one dict per (variable, step).
+    """
+    if reference not in ('analytic', 'finest'):
+        raise ValueError(f"Unknown reference: {reference!r}")
+    X = random_inputs(1_000 if model == 'withlib' else 20_000) if X is None else X
+    variables = variables or list(DEFAULT_STEPS)
+    results = []
+    # withlib prints an error line for every sample where no rule fires
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for variable in variables:
+            variable_steps = sorted(steps or DEFAULT_STEPS[variable])
+            if reference == 'analytic':
+                finest = {} if variable == 'quality' else {variable: variable_steps[0]}
+                expected = _scorer(model, defuzzification='analytic', resolution=finest)(X)
+            else:
+                expected = _scorer(model, resolution={variable: variable_steps[0]})(X)
+            for step in variable_steps:
+                scorer = _scorer(model, resolution={variable: step})
+                scorer(X[:100])
+                scores, seconds = _timed(scorer, X, repeats)
+                errors = np.abs(scores - expected)
+                categories = np.digitize(scores, (40, 70)) != np.digitize(expected, (40, 70))
+                start, stop, _ = MODELS[model].universe_specs({variable: step})[variable]
+                results.append({
+                    'model': model, 'variable': variable, 'step': step,
+                    'points': len(np.arange(start, stop, step)),
+                    'max_error': float(errors.max()), 'mean_error': float(errors.mean()),
+                    'category_mismatch': float(categories.mean()),
+                    'per_eval_us': seconds / len(X) * 1e6,
+                })
+    return results
+
+def integer_nutrition_error(X):
+    """Error of main's default integer nutrition grid against resolution={'nutrition': 1}
+
+    Both grids hold the points 0, 1, ..., 350 and differ only in the table
+    dtype: the default integer tables truncate every nutrition degree to 0
+    or 1, while any nutrition resolution is built real-valued. Returns
+    max_error, mean_error and category_mismatch like a sweep entry.
+    """
+    scores = _scorer('main')(X)
+    expected = _scorer('main', {'nutrition': 1})(X)
+    errors = np.abs(scores - expected)
+    categories = np.digitize(scores, (40, 70)) != np.digitize(expected, (40, 70))
+    return {'max_error': float(errors.max()), 'mean_error': float(errors.mean()),
+            'category_mismatch': float(categories.mean())}
+
+def coarsest_within(results, tolerance, metric='max_error'):
+    """{variable: largest step whose `metric` ('max_error' or 'mean_error') is at most `tolerance`}"""
+    best = {}
+    for entry in results:
+        if entry[metric] <= tolerance and entry['step'] > best.get(entry['variable'], 0):
+            best[entry['variable']] = entry['step']
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Sapu resolusi universe: galat skor vs waktu evaluasi")
+    parser.add_argument('--model', choices=list(MODELS), default='main')
+    parser.add_argument('--variables', nargs='+', choices=list(DEFAULT_STEPS), default=None, help="default: semua")
+    parser.add_argument('--steps', nargs='+', type=float, default=None,
+                        help="langkah grid yang dicoba untuk setiap variabel (default: daftar bawaan per variabel)")
+    parser.add_argument('--samples', type=int, default=None, help="jumlah input acak (default: 20000 main, 1000 withlib)")
+    parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='uniform', help="sebaran input acak")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--reference', choices=['analytic', 'finest'], default='analytic',
+                        help="pembanding: defuzzifikasi analitik, atau langkah terkecil yang dicoba")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help="tampilkan langkah terkasar dengan galat tidak lebih dari ini")
+    parser.add_argument('--metric', choices=['max', 'mean'], default='max', help="galat yang dibandingkan dengan --tolerance")
+    parser.add_argument('--json', default=None, help="simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    samples = args.samples or (1_000 if args.model == 'withlib' else 20_000)
+    X = random_inputs(samples, args.seed, args.distribution)
+    steps = [int(step) if step.is_integer() else step for step in args.steps] if args.steps else None
+
+    print(f"SAPU RESOLUSI UNIVERSE ({args.model}, {samples} sampel, pembanding {args.reference})")
+    print("=" * 50)
+    results = sweep_resolution(args.model, args.variables, steps, X, args.reference, args.repeats)
+    for entry in results:
+        print(f"{entry['variable']:<15} langkah {entry['step']:<6g} {entry['points']:>6} titik | "
+              f"galat maks {entry['max_error']:8.4f} | rata-rata {entry['mean_error']:8.4f} | "
+              f"kategori beda {entry['category_mismatch'] * 100:6.2f}% | {entry['per_eval_us']:9.2f} µs/evaluasi")
+
+    if args.model == 'main':
+        quirk = integer_nutrition_error(X)
+        print(f"\nCatatan: grid nutrisi bawaan main bertipe integer sehingga derajat nutrisi hanya 0/1; "
+              f"setiap resolusi nutrisi (termasuk langkah 1) memakai grid float.")
+        print(f"Grid bawaan vs resolusi nutrisi 1: galat maks {quirk['max_error']:.4f} | "
+              f"rata-rata {quirk['mean_error']:.4f} | kategori beda {quirk['category_mismatch'] * 100:.2f}%")
+
+    if args.tolerance is not None:
+        label = 'maksimum' if args.metric == 'max' else 'rata-rata'
+        print(f"\nLangkah terkasar dengan galat {label} <= {args.tolerance}:")
+        best = coarsest_within(results, args.tolerance, f"{args.metric}_error")
+        for variable in dict.fromkeys(entry['variable'] for entry in results):
+            print(f"  {variable:<15} {best[variable]:g}" if variable in best else f"  {variable:<15} tidak ada")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nHasil tersimpan di {args.json}")
+
+if __name__ == "__main__":
+    main()
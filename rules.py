@@ -0,0 +1,149 @@
+import numpy as np
+
+# Linguistic terms of every input variable, in the order membership degrees are passed around
+INPUT_TERMS = {
+    'ph': ('asam', 'normal', 'basa'),
+    'nutrition': ('rendah', 'sedang', 'tinggi'),
+    'heavy_metal': ('rendah', 'sedang', 'tinggi'),
+    'organic_matter': ('rendah', 'sedang', 'tinggi'),
+}
+OUTPUT_TERMS = ('buruk', 'sedang', 'baik')
+
+# Names used when printing rules
+VARIABLE_LABELS = {'ph': 'pH', 'nutrition': 'nutrisi', 'heavy_metal': 'logam', 'organic_matter': 'bahan organik'}
+
+# Aturan fuzzy: ({variable: terms}, consequent). Terms of one variable are joined with OR,
+# the variables with AND.
+RULES = [
+    # Aturan 1: pH normal + nutrisi tinggi + logam rendah -> baik
+    ({'ph': ('normal',), 'nutrition': ('tinggi',), 'heavy_metal': ('rendah',)}, 'baik'),
+    # Aturan 2: pH asam/basa + nutrisi rendah + logam tinggi -> buruk
+    ({'ph': ('asam', 'basa'), 'nutrition': ('rendah',), 'heavy_metal': ('tinggi',)}, 'buruk'),
+    # Aturan 3: pH normal + nutrisi sedang + logam sedang -> sedang
+    ({'ph': ('normal',), 'nutrition': ('sedang',), 'heavy_metal': ('sedang',)}, 'sedang'),
+    # Aturan 4: Bahan organik tinggi -> baik
+    ({'organic_matter': ('tinggi',)}, 'baik'),
+    # Aturan 5: Bahan organik rendah + logam tinggi -> buruk
+    ({'organic_matter': ('rendah',), 'heavy_metal': ('tinggi',)}, 'buruk'),
+    # Aturan 6: pH normal + nutrisi tinggi + logam sedang -> sedang
+    ({'ph': ('normal',), 'nutrition': ('tinggi',), 'heavy_metal': ('sedang',)}, 'sedang'),
+]
+
+class RuleBase:
+    """Rule table compiled into index arrays
+
+    Membership degrees come as one flat vector per sample, ordered as in
+    input_terms (ph asam, ph normal, ..., organic_matter tinggi). Firing
+    strengths are min over AND-ed clauses of max over OR-ed terms, and each
+    output term takes the max over the rules that conclude it.
+    """
+    def __init__(self, rules=RULES, input_terms=INPUT_TERMS, output_terms=OUTPUT_TERMS):
+        self.rules = list(rules)
+        self.input_terms = dict(input_terms)
+        self.output_terms = tuple(output_terms)
+        self.columns = [(var, term) for var, terms in self.input_terms.items() for term in terms]
+        column = {key: i for i, key in enumerate(self.columns)}
+
+        # Rule x clause x term indices into the memberships, padded with two extra
+        # columns: a constant 0 (neutral for OR) and a constant 1 (neutral for AND)
+        zero, one = len(self.columns), len(self.columns) + 1
+        n_clauses = max(len(antecedent) for antecedent, _ in self.rules)
+        n_terms = max(len(terms) for antecedent, _ in self.rules for terms in antecedent.values())
+        self.clauses = np.full((len(self.rules), n_clauses, n_terms), zero, dtype=np.intp)
+        for r, (antecedent, _) in enumerate(self.rules):
+            for c, (var, terms) in enumerate(antecedent.items()):
+                self.clauses[r, c, :len(terms)] = [column[var, term] for term in terms]
+            self.clauses[r, len(antecedent):, :] = one
+        self.consequents = np.array([self.output_terms.index(out) for _, out in self.rules])
+        self.concludes = self.consequents[None, :] == np.arange(len(self.output_terms))[:, None]
+
+        # The same structure as nested tuples for scoring one sample in plain Python
+        self._single = [(tuple(tuple(column[var, term] for term in terms) for var, terms in antecedent.items()),
+                         self.output_terms.index(out)) for antecedent, out in self.rules]
+
+        # Rules to re-evaluate when one variable's degrees change, and where those degrees sit
+        self.dependents = {var: tuple(r for r, (antecedent, _) in enumerate(self.rules) if var in antecedent)
+                           for var in self.input_terms}
+        self.slices = {}
+        for var, terms in self.input_terms.items():
+            first = column[var, terms[0]]
+            self.slices[var] = slice(first, first + len(terms))
+
+    def flatten(self, md):
+        """Flat membership vector from a nested {variable: {term: degree}} dict"""
+        return [md[var][term] for var, term in self.columns]
+
+    def firing_strengths(self, memberships):
+        """Strength of every rule for a (samples x columns) membership matrix -> (samples x rules)"""
+        memberships = np.atleast_2d(np.asarray(memberships, dtype=float))
+        padded = np.concatenate([memberships, np.zeros((len(memberships), 1)), np.ones((len(memberships), 1))], axis=1)
+        return padded[:, self.clauses].max(axis=-1).min(axis=-1)
+
+    def aggregate(self, strengths):
+        """Aggregated strength of every output term from rule strengths -> (samples x output terms)"""
+        return np.where(self.concludes[None, :, :], strengths[:, None, :], 0.0).max(axis=-1)
+
+    def alphas(self, memberships):
+        """Aggregated output strengths for a (samples x columns) membership matrix"""
+        return self.aggregate(self.firing_strengths(memberships))
+
+    def firing_strengths_single(self, memberships):
+        """Rule strengths for one sample's flat membership vector, as a list
+
+        A rule stops evaluating its clauses at the first one with degree 0.
+        """
+        strengths = []
+        for clauses, _ in self._single:
+            strength = None
+            for terms in clauses:
+                degree = max(memberships[i] for i in terms)
+                if strength is None or degree < strength:
+                    strength = degree
+                if not strength:
+                    break
+            strengths.append(strength)
+        return strengths
+
+    def strength_single(self, index, memberships):
+        """Strength of rule `index` for one sample's flat membership vector"""
+        strength = None
+        for terms in self._single[index][0]:
+            degree = max(memberships[i] for i in terms)
+            if strength is None or degree < strength:
+                strength = degree
+            if not strength:
+                break
+        return strength
+
+    def aggregate_single(self, strengths):
+        """Aggregated output strengths from one sample's rule strengths, as a list"""
+        alphas = [0.0] * len(self.output_terms)
+        for strength, (_, out) in zip(strengths, self._single):
+            if strength > alphas[out]:
+                alphas[out] = strength
+        return alphas
+
+    def alphas_single(self, memberships):
+        """Aggregated output strengths for one sample's flat membership vector, as a list"""
+        return self.aggregate_single(self.firing_strengths_single(memberships))
+
+    def describe(self, index, title=False):
+        """Rule as text, e.g. 'pH normal ∧ nutrisi tinggi ∧ logam rendah → Baik'
+
+        With title=True terms are capitalised and OR-ed terms grouped after the
+        variable name ('pH (Asam ∨ Basa)'), as in the plot captions.
+        """
+        antecedent, out = self.rules[index]
+        clauses = []
+        for var, terms in antecedent.items():
+            label = VARIABLE_LABELS.get(var, var)
+            if title:
+                label = ' '.join(word.capitalize() if word.islower() else word for word in label.split())
+                terms = [term.capitalize() for term in terms]
+                clauses.append(f"{label} {terms[0]}" if len(terms) == 1 else f"{label} ({' ∨ '.join(terms)})")
+            else:
+                clauses.append(f"{label} {terms[0]}" if len(terms) == 1 else f"({label} {' ∨ '.join(terms)})")
+        return f"{' ∧ '.join(clauses)} → {out.capitalize()}"
+
+# Shared compiled rule base of the soil-quality system
+RULE_BASE = RuleBase()
@@ -0,0 +1,77 @@
+from rules import RULE_BASE
+
+VARIABLES = ('ph', 'nutrition', 'heavy_metal', 'organic_matter')
+
+def categorize(score):
+    return "Buruk" if score < 40 else "Sedang" if score < 70 else "Baik"
+
+class Scenario:
+    """Fuzzified state of one sample that re-scores cheaply after changing some inputs
+
+    `fuzzifiers` maps every variable to a function returning its membership
+    degrees in rule_base.input_terms order, and `defuzzify` turns the list
+    of aggregated output strengths into a score. update() refuzzifies only
+    the changed variables and re-evaluates only the rules with a clause on
+    them; aggregation and defuzzification then run on the stored strengths.
+
+        s = system.scenario(5.2, 180, 8, 3.5)
+        s.score                    # baseline
+        s.what_if(ph=6.4)          # after liming, baseline untouched
+        s.update(ph=6.4)           # keep the new pH
+    """
+    def __init__(self, fuzzifiers, defuzzify, values, rule_base=RULE_BASE):
+        self.fuzzifiers = fuzzifiers
+        self.defuzzify = defuzzify
+        self.rule_base = rule_base
+        self.values = dict(zip(VARIABLES, values))
+        self.memberships = [0.0] * len(rule_base.columns)
+        for variable, value in self.values.items():
+            self.memberships[rule_base.slices[variable]] = fuzzifiers[variable](value)
+        self.strengths = rule_base.firing_strengths_single(self.memberships)
+        self._score()
+
+    def _score(self):
+        self.alphas = self.rule_base.aggregate_single(self.strengths)
+        self.score = self.defuzzify(self.alphas)
+        self.category = categorize(self.score)
+
+    def update(self, **changes):
+        """Set new values for some variables and return the new (score, category)"""
+        for variable in changes:
+            if variable not in self.values:
+                raise ValueError(f"Unknown variable: {variable!r}")
+        changed = [variable for variable, value in changes.items() if value != self.values[variable]]
+        if not changed:
+            return self.score, self.category
+        rules = set()
+        for variable in changed:
+            self.values[variable] = changes[variable]
+            self.memberships[self.rule_base.slices[variable]] = self.fuzzifiers[variable](changes[variable])
+            rules.update(self.rule_base.dependents[variable])
+        for index in rules:
+            self.strengths[index] = self.rule_base.strength_single(index, self.memberships)
+        self._score()
+        return self.score, self.category
+
+    def what_if(self, **changes):
+        """(score, category) with some variables changed, leaving this scenario as it is"""
+        return self.copy().update(**changes)
+
+    def copy(self):
+        clone = object.__new__(Scenario)
+        clone.__dict__.update(self.__dict__)
+        clone.values = dict(self.values)
+        clone.memberships = list(self.memberships)
+        clone.strengths = list(self.strengths)
+        return clone
+
+    def trace(self):
+        """Inputs, membership degrees, rule strengths and aggregated strengths as a dict"""
+        return {
+            'values': dict(self.values),
+            'memberships': {variable: dict(zip(terms, self.memberships[self.rule_base.slices[variable]]))
+                            for variable, terms in self.rule_base.input_terms.items()},
+            'strengths': list(self.strengths),
+            'alphas': dict(zip(self.rule_base.output_terms, self.alphas)),
+            'score': self.score, 'category': self.category,
+        }
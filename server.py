@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import batch
+
+# Request fields in input order; the data.csv column names are accepted too
+FIELDS = ('ph', 'nutrition', 'heavy_metal', 'organic_matter')
+ALIASES = {'pH': 'ph', 'Nutrisi': 'nutrition', 'Logam_Berat': 'heavy_metal', 'Bahan_Organik': 'organic_matter'}
+
+MAX_BODY = 1 << 20
+
+def make_scorer(model='main', control_surface=None, lookup_table=None, defuzzification='discrete'):
+    """Function scoring an (n x 4) matrix -> (scores, categories): batch.make_scorer on the matrix columns"""
+    score = batch.make_scorer(model, control_surface, lookup_table, defuzzification)
+    return lambda X: score(dict(zip(batch.INPUT_COLUMNS, X.T)))
+
+class MicroBatcher:
+    """Scores concurrent requests together in one vectorized call per batch
+
+    A batch opens with the first waiting request and closes when it holds
+    max_batch samples or max_latency seconds have passed, whichever comes
+    first. Batches are scored one at a time on a single worker thread, so
+    requests arriving while a batch is being scored queue up for the next
+    one and the event loop keeps accepting connections.
+    """
+    def __init__(self, score, max_batch=256, max_latency=0.002):
+        self.score = score
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.batches = self.samples = self.requests = 0
+        self.scoring_seconds = 0.0
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix='scorer')
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, rows):
+        """(scores, categories) for the (k x 4) matrix `rows`, once its batch is scored"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((rows, future))
+        return await future
+
+    async def _next_batch(self):
+        pending = [await self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_latency
+        while size < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get_nowait() if not self._queue.empty() else \
+                    await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = await self._next_batch()
+            X = np.concatenate([rows for rows, _ in pending])
+            start = time.perf_counter()
+            try:
+                scores, categories = await loop.run_in_executor(self._executor, self.score, X)
+            except Exception as error:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.scoring_seconds += time.perf_counter() - start
+            self.batches += 1
+            self.samples += len(X)
+            self.requests += len(pending)
+            offset = 0
+            for rows, future in pending:
+                if not future.done():
+                    future.set_result((scores[offset:offset + len(rows)], categories[offset:offset + len(rows)]))
+                offset += len(rows)
+
+    def to_prometheus(self, prefix='soil_fuzzy'):
+        """Batch counters in Prometheus text exposition format"""
+        lines = []
+        for name, value, help_text in [('batches', self.batches, 'Scored micro-batches'),
+                                       ('requests', self.requests, 'Scored requests'),
+                                       ('samples', self.samples, 'Scored samples'),
+                                       ('scoring_seconds', self.scoring_seconds, 'Time spent scoring batches')]:
+            metric = f"{prefix}_server_{name}_total"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter", f"{metric} {value}"]
+        return '\n'.join(lines) + '\n'
+
+class BadRequest(Exception):
+    pass
+
+def parse_samples(payload):
+    """(n x 4) matrix and whether the reply is for a single sample
+
+    Accepts one object with the four inputs, a list of such objects, or
+    {"samples": [[ph, nutrition, heavy_metal, organic_matter], ...]}.
+    """
+    if isinstance(payload, dict) and 'samples' in payload:
+        rows, single = payload['samples'], False
+    elif isinstance(payload, dict):
+        rows, single = [payload], True
+    elif isinstance(payload, list):
+        rows, single = payload, False
+    else:
+        raise BadRequest("Body harus berupa objek JSON atau list")
+    if not isinstance(rows, list):
+        raise BadRequest("samples harus berupa list")
+    matrix = []
+    for row in rows:
+        if isinstance(row, dict):
+            row = {ALIASES.get(key, key): value for key, value in row.items()}
+            missing = [field for field in FIELDS if field not in row]
+            if missing:
+                raise BadRequest(f"Field tidak ada: {', '.join(missing)}")
+            row = [row[field] for field in FIELDS]
+        if not isinstance(row, list) or len(row) != len(FIELDS):
+            raise BadRequest("Setiap sampel harus punya 4 nilai: ph, nutrition, heavy_metal, organic_matter")
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in row):
+            raise BadRequest("Nilai input harus berupa angka")
+        matrix.append(row)
+    if not matrix:
+        raise BadRequest("Tidak ada sampel")
+    return np.array(matrix, dtype=float), single
+
+class ScoringServer:
+    """HTTP/1.1 scoring service on asyncio streams
+
+    POST /score   JSON samples (see parse_samples) -> scores and categories
+    GET  /health  liveness check
+    GET  /metrics batch counters in Prometheus format
+    Connections are kept alive between requests unless the client closes them.
+    """
+    def __init__(self, score, max_batch=256, max_latency=0.002):
+        self.batcher = MicroBatcher(score, max_batch, max_latency)
+
+    async def _respond(self, writer, status, body, content_type='application/json', keep_alive=True):
+        if not isinstance(body, bytes):
+            body = (json.dumps(body) if content_type == 'application/json' else body).encode()
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                  413: 'Payload Too Large', 500: 'Internal Server Error'}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                     .encode() + body)
+        await writer.drain()
+
+    async def _score(self, body):
+        try:
+            rows, single = parse_samples(json.loads(body))
+        except json.JSONDecodeError:
+            return 400, {'error': "Body bukan JSON yang valid"}
+        except BadRequest as error:
+            return 400, {'error': str(error)}
+        scores, categories = await self.batcher.submit(rows)
+        if single:
+            return 200, {'score': float(scores[0]), 'category': str(categories[0])}
+        return 200, {'scores': [float(s) for s in scores], 'categories': [str(c) for c in categories]}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "Request line tidak valid"}, keep_alive=False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {'error': "Content-Length tidak valid"}, keep_alive=False)
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {'error': "Body terlalu besar"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                path = path.split('?', 1)[0]
+                if path == '/score':
+                    if method != 'POST':
+                        status, reply = 405, {'error': "Gunakan POST"}
+                    else:
+                        try:
+                            status, reply = await self._score(body)
+                        except Exception as error:
+                            status, reply = 500, {'error': str(error)}
+                    await self._respond(writer, status, reply, keep_alive=keep_alive)
+                elif path == '/health':
+                    await self._respond(writer, 200, {'status': 'ok'}, keep_alive=keep_alive)
+                elif path == '/metrics':
+                    await self._respond(writer, 200, self.batcher.to_prometheus(), 'text/plain; version=0.0.4',
+                                        keep_alive=keep_alive)
+                else:
+                    await self._respond(writer, 404, {'error': f"Path tidak dikenal: {path}"}, keep_alive=keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080, ready=None):
+        """Serve until cancelled; `ready` (a threading.Event) is set once the socket listens"""
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Server HTTP untuk skor kualitas tanah dengan micro-batching")
+    parser.add_argument('--model', choices=['main', 'manual', 'withlib', 'lut'], default='main')
+    parser.add_argument('--defuzzification', choices=['discrete', 'analytic'], default='discrete')
+    parser.add_argument('--control-surface', default=None, help="file .npz ControlSurface untuk model withlib")
+    parser.add_argument('--lookup-table', default=None, help="tabel .npy dari lut.py untuk model lut")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch', type=int, default=256, help="sampel maksimum per batch")
+    parser.add_argument('--max-latency-ms', type=float, default=2.0,
+                        help="waktu tunggu maksimum untuk mengisi batch (milidetik)")
+    args = parser.parse_args()
+
+    score = make_scorer(args.model, args.control_surface, args.lookup_table, args.defuzzification)
+    server = ScoringServer(score, args.max_batch, args.max_latency_ms / 1000)
+    print(f"Server {args.model} berjalan di http://{args.host}:{args.port} "
+          f"(batch maks {args.max_batch}, tunggu maks {args.max_latency_ms} ms)", flush=True)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from withlib import FuzzySoilQuality
+
+def random_inputs(n, seed=0):
+    """Input acak yang mencakup seluruh universe, termasuk sedikit di luar batas"""
+    rng = np.random.default_rng(seed)
+    return list(zip(rng.uniform(3.5, 9.5, n).tolist(),
+                    rng.uniform(-10, 360, n).tolist(),
+                    rng.uniform(-1, 31, n).tolist(),
+                    rng.uniform(-0.5, 10.5, n).tolist()))
+
+def stress_test(samples=2000, threads=8, rounds=3, seed=0):
+    """Bandingkan hasil evaluate() serial dengan hasil dari ThreadPoolExecutor
+
+    Satu instance FuzzySoilQuality dipakai bersama oleh semua thread. Setiap
+    ronde mengacak urutan input supaya thread saling bersilangan pada sampel
+    yang berbeda. Mengembalikan jumlah hasil yang berbeda dari referensi serial.
+    """
+    system = FuzzySoilQuality()
+    inputs = random_inputs(samples, seed)
+
+    start = time.perf_counter()
+    reference = [system.evaluate(*row) for row in inputs]
+    serial_time = time.perf_counter() - start
+    print(f"Serial: {samples} sampel dalam {serial_time:.2f} detik")
+
+    rng = np.random.default_rng(seed + 1)
+    mismatches = 0
+    for r in range(rounds):
+        order = rng.permutation(samples)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(lambda i: system.evaluate(*inputs[i]), order))
+        elapsed = time.perf_counter() - start
+        wrong = sum(result != reference[i] for i, result in zip(order, results))
+        mismatches += wrong
+        print(f"Ronde {r + 1}: {threads} thread, {elapsed:.2f} detik, {wrong} hasil berbeda")
+
+    print("✅ Hasil identik di bawah beban konkuren" if mismatches == 0
+          else f"❌ {mismatches} hasil berbeda dari referensi serial")
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Uji beban konkuren withlib.FuzzySoilQuality.evaluate")
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    raise SystemExit(1 if stress_test(args.samples, args.threads, args.rounds, args.seed) else 0)
+
+if __name__ == "__main__":
+    main()
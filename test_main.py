@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from main import FuzzyMamdaniSoilQuality
+
+def test_nutrition_resolution_ignores_how_the_step_is_written():
+    as_int = FuzzyMamdaniSoilQuality(resolution={'nutrition': 5})
+    as_float = FuzzyMamdaniSoilQuality(resolution={'nutrition': 5.0})
+    assert as_int.nutrition_range.dtype == as_float.nutrition_range.dtype == np.float64
+    assert as_int.nutrition_membership(120) == pytest.approx((0.6, 0.7, 0.0))
+    assert as_float.nutrition_membership(120) == pytest.approx((0.6, 0.7, 0.0))
+
+def test_default_nutrition_grid_keeps_integer_points():
+    system = FuzzyMamdaniSoilQuality()
+    assert system.nutrition_range.dtype.kind == 'i'
+    assert system.nutrition_membership(120) == (0, 0, 0)
+
+def test_resolution_step_leaving_one_point_is_rejected():
+    with pytest.raises(ValueError, match="at least two points"):
+        FuzzyMamdaniSoilQuality(resolution={'ph': 6})
+
+def test_resolution_range_leaving_no_points_is_rejected():
+    with pytest.raises(ValueError, match="at least two points"):
+        FuzzyMamdaniSoilQuality(resolution={'ph': (9, 4, 0.1)})
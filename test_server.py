@@ -0,0 +1,61 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+from server import BadRequest, ScoringServer, parse_samples
+
+@pytest.mark.parametrize('payload', [
+    {'samples': 5},
+    {'samples': {'ph': 6.5}},
+    {'samples': [[6.5, 200, 5]]},
+    {'samples': [[[6.5], [200], [5], [2]]]},
+    {'samples': [[6.5, '200', 5, 2]]},
+    {'samples': [[True, 200, 5, 2]]},
+])
+def test_parse_samples_rejects_anything_but_rows_of_four_numbers(payload):
+    with pytest.raises(BadRequest):
+        parse_samples(payload)
+
+def test_parse_samples_accepts_rows_and_objects():
+    rows, single = parse_samples({'samples': [[6.5, 200, 5, 2], [7, 100, 1.5, 3]]})
+    assert rows.shape == (2, 4) and not single
+    rows, single = parse_samples({'pH': 6.5, 'Nutrisi': 200, 'heavy_metal': 5, 'organic_matter': 2})
+    assert rows.tolist() == [[6.5, 200, 5, 2]] and single
+
+def _request(raw):
+    """Status line and JSON body of the reply to raw request bytes"""
+    async def run():
+        server = ScoringServer(lambda X: (np.full(len(X), 50.0), np.full(len(X), 'Sedang')))
+        server.batcher.start()
+        listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+        try:
+            reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+            writer.write(raw)
+            await writer.drain()
+            reply = await reader.read()
+            writer.close()
+        finally:
+            listener.close()
+            await server.batcher.close()
+        head, _, body = reply.partition(b'\r\n\r\n')
+        return head.split(b'\r\n')[0].decode(), json.loads(body)
+    return asyncio.run(run())
+
+def test_samples_that_are_not_a_list_get_400():
+    body = b'{"samples": 5}'
+    status, reply = _request(b'POST /score HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n%s'
+                             % (len(body), body))
+    assert status == 'HTTP/1.1 400 Bad Request'
+    assert 'error' in reply
+
+def test_non_numeric_content_length_gets_400():
+    status, reply = _request(b'POST /score HTTP/1.1\r\nContent-Length: abc\r\n\r\n')
+    assert status == 'HTTP/1.1 400 Bad Request'
+    assert reply == {'error': "Content-Length tidak valid"}
+
+def test_valid_request_is_scored():
+    body = b'{"samples": [[6.5, 200, 5, 2]]}'
+    status, reply = _request(b'POST /score HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n%s'
+                             % (len(body), body))
+    assert status == 'HTTP/1.1 200 OK'
+    assert reply == {'scores': [50.0], 'categories': ['Sedang']}
@@ -1,33 +1,116 @@
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 import warnings
 import os
-from tabulate import tabulate
+import copy
+import threading
+import operator
+from functools import reduce
 warnings.filterwarnings('ignore', category=UserWarning, module='skfuzzy')
 warnings.filterwarnings('ignore', category=UserWarning, module='matplotlib')
 import skfuzzy as fuzz
 from skfuzzy import control as ctrl
+from cache import ResultCache
+from centroid import AnalyticCentroid
+import plotting
+import profiling
+from rules import RULES, RULE_BASE
+
+# Galat rata-rata (poin skor) terhadap compute() yang masih diterima dari sebuah ControlSurface.
+# Galat maksimum tidak dipakai: di tepi daerah aktif aturan skor melompat, jadi galat
+# maksimum interpolasi tetap sekitar 24 poin berapa pun kerapatan grid-nya
+SURFACE_TOLERANCE = 2.5
+
+# Urutan jumlah titik per sumbu yang dicoba build_control_surface() sampai target galat tercapai
+SURFACE_POINTS = (4, 6, 8, 11, 16)
 
 class FuzzySoilQuality:
-    def __init__(self):
-        # Definisikan variabel
-        self.ph = ctrl.Antecedent(np.arange(4, 10, 0.1), 'pH')
-        self.nutrition = ctrl.Antecedent(np.arange(0, 351, 1), 'nutrition')
-        self.heavy_metal = ctrl.Antecedent(np.arange(0, 31, 0.1), 'heavy_metal')
-        self.organic_matter = ctrl.Antecedent(np.arange(0, 11, 0.1), 'organic_matter')
-        self.quality = ctrl.Consequent(np.arange(0, 101, 0.1), 'quality')
+    # Fungsi keanggotaan output sebagai titik patah (x, μ), untuk defuzzifikasi analitik.
+    # trimf bernilai 0 di luar [a, c], jadi 'baik' turun ke 0 setelah 100.
+    quality_breakpoints = (
+        [(0, 1.0), (50, 0.0)],               # buruk  [0, 0, 50]
+        [(20, 0.0), (50, 1.0), (80, 0.0)],   # sedang [20, 50, 80]
+        [(50, 0.0), (100, 1.0), (100, 0.0)], # baik   [50, 100, 100]
+    )
+
+    # Universe bawaan tiap variabel sebagai np.arange(start, stop, step); lihat `resolution`
+    universes = {
+        'ph': (4, 10, 0.1),
+        'nutrition': (0, 351, 1),
+        'heavy_metal': (0, 31, 0.1),
+        'organic_matter': (0, 11, 0.1),
+        'quality': (0, 101, 0.1),
+    }
+
+    def __init__(self, defuzzification='discrete', control_surface=None, cache_size=None, resolution=None,
+                 simulation_cache=True, surface_tolerance=SURFACE_TOLERANCE):
+        # 'discrete': centroid dari skfuzzy compute() di atas universe kualitas
+        # 'analytic': centroid eksak dari fungsi output yang terpotong, tanpa compute()
+        if defuzzification not in ('discrete', 'analytic'):
+            raise ValueError(f"Metode defuzzifikasi tidak dikenal: {defuzzification!r}")
+        self.defuzzification = defuzzification
+
+        # ControlSurface (atau path file .npz-nya) untuk menjawab evaluate() dengan interpolasi;
+        # ditolak jika galat rata-ratanya melebihi surface_tolerance (None: tidak diperiksa)
+        if isinstance(control_surface, (str, os.PathLike)):
+            control_surface = ControlSurface.load(control_surface)
+        if control_surface is not None and surface_tolerance is not None:
+            control_surface.check(surface_tolerance)
+        self.control_surface = control_surface
+
+        # Definisikan variabel. `resolution` memetakan variabel ke langkah grid-nya, atau ke
+        # (start, stop, step) lengkap, menggantikan nilai bawaan di `universes`
+        universes = self.universe_specs(resolution)
+        self.ph = ctrl.Antecedent(np.arange(*universes['ph']), 'pH')
+        self.nutrition = ctrl.Antecedent(np.arange(*universes['nutrition']), 'nutrition')
+        self.heavy_metal = ctrl.Antecedent(np.arange(*universes['heavy_metal']), 'heavy_metal')
+        self.organic_matter = ctrl.Antecedent(np.arange(*universes['organic_matter']), 'organic_matter')
+        self.quality = ctrl.Consequent(np.arange(*universes['quality']), 'quality')
         
         # Setup fungsi keanggotaan
         self._setup_membership_functions()
         
-        # Buat sistem kontrol
-        self.control_system = self._create_rules()
+        # Buat sistem kontrol. Simulasi skfuzzy menyimpan state di objek aturannya,
+        # jadi setiap thread memakai salinan sistem sendiri (lihat control_system)
+        self._control = self._create_rules()
+        self._local = threading.local()
+        # False mematikan cache hasil bawaan ControlSystemSimulation, sehingga input yang
+        # berulang tetap dihitung ulang (mis. untuk benchmark)
+        self.simulation_cache = simulation_cache
         
-        # Buat folder output jika belum ada
-        if not os.path.exists('output'):
-            os.makedirs('output')
+        # Cache LRU hasil evaluate(), dengan kunci input yang dibulatkan ke langkah universe
+        self.result_cache = None
+        if cache_size:
+            steps = [float(np.round(np.diff(var.universe).mean(), 9))
+                     for var in (self.ph, self.nutrition, self.heavy_metal, self.organic_matter)]
+            self.result_cache = ResultCache(cache_size, steps)
+        self.centroid = AnalyticCentroid(self.quality_breakpoints, self.quality.universe[0], self.quality.universe[-1])
     
+    def __getstate__(self):
+        # threading.local tidak bisa di-pickle; salinan mulai dengan simulasi per thread yang baru
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @classmethod
+    def universe_specs(cls, resolution=None):
+        """(start, stop, step) setiap universe setelah `resolution` diterapkan"""
+        specs = dict(cls.universes)
+        for name, value in (resolution or {}).items():
+            if name not in specs:
+                raise ValueError(f"Variabel tidak dikenal di resolution: {name!r}")
+            start, stop, step = value if isinstance(value, tuple) else (*specs[name][:2], value)
+            if not step > 0:
+                raise ValueError(f"Langkah untuk {name!r} harus positif, bukan {step!r}")
+            if len(np.arange(start, stop, step)) < 2:
+                raise ValueError(f"Universe {name!r} butuh minimal dua titik, "
+                                 f"bukan np.arange({start!r}, {stop!r}, {step!r})")
+            specs[name] = (start, stop, step)
+        return specs
+
     def _setup_membership_functions(self):
         """Setup semua fungsi keanggotaan"""
         # Fungsi keanggotaan pH - sesuai spesifikasi soal
@@ -56,43 +139,83 @@ class FuzzySoilQuality:
         self.quality['baik'] = fuzz.trimf(self.quality.universe, [50, 100, 100])   # 70-100
     
     def _create_rules(self):
-        """Buat aturan fuzzy sesuai soal"""
-        rules = [
-            # Aturan 1: pH normal + nutrisi tinggi + logam rendah -> baik
-            ctrl.Rule(self.ph['normal'] & self.nutrition['tinggi'] & self.heavy_metal['rendah'], self.quality['baik']),
-            
-            # Aturan 2: pH asam/basa + nutrisi rendah + logam tinggi -> buruk
-            ctrl.Rule((self.ph['asam'] | self.ph['basa']) & self.nutrition['rendah'] & self.heavy_metal['tinggi'], self.quality['buruk']),
-            
-            # Aturan 3: pH normal + nutrisi sedang + logam sedang -> sedang
-            ctrl.Rule(self.ph['normal'] & self.nutrition['sedang'] & self.heavy_metal['sedang'], self.quality['sedang']),
-            
-            # Aturan 4: Bahan organik tinggi -> baik
-            ctrl.Rule(self.organic_matter['tinggi'], self.quality['baik']),
-            
-            # Aturan 5: Bahan organik rendah + logam tinggi -> buruk
-            ctrl.Rule(self.organic_matter['rendah'] & self.heavy_metal['tinggi'], self.quality['buruk']),
-            
-            # Aturan 6: pH normal + nutrisi tinggi + logam sedang -> sedang
-            ctrl.Rule(self.ph['normal'] & self.nutrition['tinggi'] & self.heavy_metal['sedang'], self.quality['sedang'])
-        ]
+        """Buat aturan fuzzy sesuai soal (lihat rules.RULES)"""
+        variables = {'ph': self.ph, 'nutrition': self.nutrition,
+                     'heavy_metal': self.heavy_metal, 'organic_matter': self.organic_matter}
+        rules = []
+        for antecedent, consequent in RULES:
+            # Term dalam satu variabel digabung dengan OR, antar variabel dengan AND
+            clauses = [reduce(operator.or_, (variables[var][term] for term in terms)) for var, terms in antecedent.items()]
+            rules.append(ctrl.Rule(reduce(operator.and_, clauses), self.quality[consequent]))
         
-        return ctrl.ControlSystemSimulation(ctrl.ControlSystem(rules))
+        return ctrl.ControlSystem(rules)
+
+    def _simulation(self, **kwargs):
+        """Simulasi baru di atas salinan sistem kontrol, tidak berbagi state dengan simulasi lain"""
+        return ctrl.ControlSystemSimulation(copy.deepcopy(self._control), **kwargs)
+
+    @property
+    def control_system(self):
+        """ControlSystemSimulation milik thread pemanggil, dibuat saat pertama dipakai"""
+        simulation = getattr(self._local, 'simulation', None)
+        if simulation is None:
+            simulation = self._local.simulation = self._simulation(cache=self.simulation_cache)
+        return simulation
     
     def evaluate(self, ph, nutrition, heavy_metal, organic_matter):
-        """Evaluasi kualitas tanah"""
+        """Evaluasi kualitas tanah (aman dipanggil dari banyak thread sekaligus)"""
+        if self.result_cache is not None:
+            return self.result_cache.get((ph, nutrition, heavy_metal, organic_matter), self._evaluate)
+        return self._evaluate(ph, nutrition, heavy_metal, organic_matter)
+    
+    def _evaluate(self, ph, nutrition, heavy_metal, organic_matter):
+        """Evaluasi satu sampel tanpa cache hasil"""
+        # Waktu per tahap hanya dicatat saat profiling aktif
+        stats = profiling.active
+        start = stats and stats.now()
+        
+        if self.control_surface is not None:
+            scores, categories = self.control_surface.evaluate(ph, nutrition, heavy_metal, organic_matter)
+            if stats:
+                stats.record('withlib', 'interpolation', start)
+            return float(scores[0]), str(categories[0])
+
+        if self.defuzzification == 'analytic':
+            md = self._interp_membership_degrees(ph, nutrition, heavy_metal, organic_matter)
+            if stats:
+                start = stats.record('withlib', 'fuzzification', start)
+            strengths = RULE_BASE.firing_strengths_single(RULE_BASE.flatten(md))
+            if stats:
+                start = stats.record('withlib', 'rule_evaluation', start)
+            alphas = RULE_BASE.aggregate_single(strengths)
+            if stats:
+                start = stats.record('withlib', 'aggregation', start)
+            score = self.centroid.single(alphas)
+            if stats:
+                stats.record('withlib', 'defuzzification', start)
+            category = "Buruk" if score < 40 else "Sedang" if score < 70 else "Baik"
+            return score, category
+
         try:
             # Set input
-            self.control_system.input['pH'] = ph
-            self.control_system.input['nutrition'] = nutrition
-            self.control_system.input['heavy_metal'] = heavy_metal
-            self.control_system.input['organic_matter'] = organic_matter
+            simulation = self.control_system
+            simulation.input['pH'] = ph
+            simulation.input['nutrition'] = nutrition
+            simulation.input['heavy_metal'] = heavy_metal
+            simulation.input['organic_matter'] = organic_matter
+            if stats:
+                start = stats.record('withlib', 'input', start)
             
-            # Hitung
-            self.control_system.compute()
+            # Hitung (fuzzifikasi, aturan, agregasi dan defuzzifikasi terjadi di dalam skfuzzy).
+            # Output lama dikosongkan dulu: untuk input yang tidak memicu aturan, cache skfuzzy
+            # tidak mengisi output sehingga skor sampel sebelumnya ikut terbaca
+            simulation.output.clear()
+            simulation.compute()
+            if stats:
+                stats.record('withlib', 'compute', start)
             
             # Ambil hasil
-            score = self.control_system.output['quality']
+            score = simulation.output['quality']
             
             # Tentukan kategori
             if score < 40:
@@ -108,202 +231,265 @@ class FuzzySoilQuality:
             print(f"Error: {e}")
             return 50.0, "Sedang"
     
-    def plot_membership_functions(self):
-        """Plot fungsi keanggotaan dengan kode yang sangat ringkas, tanpa mengubah hasil visual maupun output print."""
-        plt.ioff()
-        def plot_mf(ax, universe, mfs):
-            for func, params, label in mfs:
-                ax.plot(universe, func(universe, params), label=label)
-            ax.grid(True, alpha=0.3)
-            ax.legend(fontsize=10)
-        # Semua parameter membership function
-        mf_params = [
-            dict(var=self.ph, mfs=[(fuzz.trapmf, [4, 4, 5.5, 6.0], 'Asam'), (fuzz.trimf, [5.5, 6.5, 7.5], 'Normal'), (fuzz.trapmf, [6.5, 7.0, 9, 9], 'Basa')], title='pH Tanah (Asam: <6.0, Normal: 6.0-7.0, Basa: >7.0)', xlabel='Nilai pH', filename='ph_membership'),
-            dict(var=self.nutrition, mfs=[(fuzz.trimf, [0, 0, 150], 'Rendah'), (fuzz.trimf, [50, 150, 250], 'Sedang'), (fuzz.trimf, [150, 350, 350], 'Tinggi')], title='Nutrisi (Rendah: <100, Sedang: 100-200, Tinggi: >200 mg/kg)', xlabel='Nutrisi (mg/kg)', filename='nutrition_membership'),
-            dict(var=self.heavy_metal, mfs=[(fuzz.trimf, [0, 0, 15], 'Rendah'), (fuzz.trimf, [5, 15, 25], 'Sedang'), (fuzz.trimf, [15, 30, 30], 'Tinggi')], title='Logam Berat (Rendah: <10, Sedang: 10-20, Tinggi: >20 mg/kg)', xlabel='Logam Berat (mg/kg)', filename='heavy_metal_membership'),
-            dict(var=self.organic_matter, mfs=[(fuzz.trimf, [0, 0, 3], 'Rendah'), (fuzz.trimf, [1, 3.5, 6], 'Sedang'), (fuzz.trimf, [4, 10, 10], 'Tinggi')], title='Bahan Organik (Rendah: <2, Sedang: 2-5, Tinggi: >5%)', xlabel='Bahan Organik (%)', filename='organic_matter_membership'),
-            dict(var=self.quality, mfs=[(fuzz.trimf, [0, 0, 50], 'Buruk'), (fuzz.trimf, [20, 50, 80], 'Sedang'), (fuzz.trimf, [50, 100, 100], 'Baik')], title='Kualitas Tanah (Buruk: 0-40, Sedang: 40-70, Baik: 70-100)', xlabel='Skor Kualitas', filename='quality_membership')
-        ]
-        # Plot individual
-        for p in mf_params:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            plot_mf(ax, p['var'].universe, p['mfs'])
-            ax.set_title(p['title'], fontsize=14, fontweight='bold', pad=15)
-            ax.set_xlabel(p['xlabel'], fontsize=12)
-            ax.set_ylabel('Derajat Keanggotaan', fontsize=12)
-            plt.tight_layout()
-            plt.savefig(f"output/{p['filename']}.png", dpi=300, bbox_inches='tight')
-            plt.close()
-        # Ringkasan
-        fig, axes = plt.subplots(2, 3, figsize=(15, 10))
-        fig.suptitle('Sistem Fuzzy Mamdani - Evaluasi Kualitas Tanah', fontsize=16, fontweight='bold')
-        for i, (p, ax) in enumerate(zip(mf_params, [axes[0,0], axes[0,1], axes[0,2], axes[1,0], axes[1,1]])):
-            plot_mf(ax, p['var'].universe, p['mfs'])
-            ax.set_title(p['title'].split('(')[0].strip(), fontsize=12, fontweight='bold')
-            ax.legend(fontsize=8)
-        axes[1,2].axis('off')
-        axes[1,2].text(0.1, 0.5, \
-                       'Aturan Fuzzy:\n\n'
-                       '1. pH Normal ∧ Nutrisi Tinggi ∧ Logam Rendah → Baik\n'
-                       '2. pH (Asam ∨ Basa) ∧ Nutrisi Rendah ∧ Logam Tinggi → Buruk\n'
-                       '3. pH Normal ∧ Nutrisi Sedang ∧ Logam Sedang → Sedang\n'
-                       '4. Bahan Organik Tinggi → Baik\n'
-                       '5. Bahan Organik Rendah ∧ Logam Tinggi → Buruk\n'
-                       '6. pH Normal ∧ Nutrisi Tinggi ∧ Logam Sedang → Sedang\n\n'
-                       'Agil Ghani Istikmal (5220411040)',
-                       fontsize=10, transform=axes[1,2].transAxes,
-                       bbox=dict(boxstyle="round,pad=0.5", facecolor="lightblue", alpha=0.7))
-        plt.tight_layout()
-        plt.savefig('output/all_membership_functions.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        print("Visualisasi fungsi keanggotaan berhasil dibuat")
+    def _fires(self, ph, nutrition, heavy_metal, organic_matter):
+        """True untuk input yang mengaktifkan minimal satu aturan (compute() gagal jika tidak ada)"""
+        md = self._interp_membership_degrees(ph, nutrition, heavy_metal, organic_matter)
+        return RULE_BASE.alphas(np.column_stack(RULE_BASE.flatten(md))).max(axis=1) > 0
 
-    # Fungsi utilitas untuk manual membership degree
-    def _trimf(self, x, params):
-        a, b, c = params
-        if x <= a or x >= c:
-            return 0.0
-        elif a < x < b:
-            return (x - a) / (b - a)
-        elif b <= x < c:
-            return (c - x) / (c - b)
-        elif x == b:
-            return 1.0
-        return 0.0
+    def _compute_points(self, points, workers=None):
+        """Skor compute() untuk setiap baris (ph, nutrition, heavy_metal, organic_matter); 50.0 jika tidak ada aturan aktif
 
-    def _trapmf(self, x, params):
-        a, b, c, d = params
-        if x <= a or x >= d:
-            return 0.0
-        elif a < x < b:
-            return (x - a) / (b - a)
-        elif b <= x <= c:
-            return 1.0
-        elif c < x < d:
-            return (d - x) / (d - c)
-        return 0.0
+        Dengan workers > 1 baris dibagi ke beberapa proses.
+        """
+        if workers and workers > 1 and len(points) > workers:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(workers) as pool:
+                return np.concatenate(list(pool.map(self._compute_points, np.array_split(points, 4 * workers))))
+        sim = self._simulation(cache=False)
+        scores = np.full(len(points), 50.0)
+        for i in np.flatnonzero(self._fires(*points.T)):
+            for name, value in zip(['pH', 'nutrition', 'heavy_metal', 'organic_matter'], points[i]):
+                sim.input[name] = value
+            sim.compute()
+            scores[i] = sim.output['quality']
+        return scores
 
-    def _get_membership_degrees(self, ph, nutrition, heavy_metal, organic_matter):
-        """Hitung derajat keanggotaan semua input pada setiap label"""
-        ph_degrees = {
-            'asam': self._trapmf(ph, [4, 4, 5.5, 6.0]),
-            'normal': self._trimf(ph, [5.5, 6.5, 7.5]),
-            'basa': self._trapmf(ph, [6.5, 7.0, 9, 9])
-        }
-        nutrition_degrees = {
-            'rendah': self._trimf(nutrition, [0, 0, 150]),
-            'sedang': self._trimf(nutrition, [50, 150, 250]),
-            'tinggi': self._trimf(nutrition, [150, 350, 350])
-        }
-        heavy_metal_degrees = {
-            'rendah': self._trimf(heavy_metal, [0, 0, 15]),
-            'sedang': self._trimf(heavy_metal, [5, 15, 25]),
-            'tinggi': self._trimf(heavy_metal, [15, 30, 30])
-        }
-        organic_matter_degrees = {
-            'rendah': self._trimf(organic_matter, [0, 0, 3]),
-            'sedang': self._trimf(organic_matter, [1, 3.5, 6]),
-            'tinggi': self._trimf(organic_matter, [4, 10, 10])
-        }
+    def _surface_axes(self, points):
+        """Sumbu grid: `points` titik merata ditambah titik patah fungsi keanggotaan tiap variabel"""
+        axes = []
+        for var in (self.ph, self.nutrition, self.heavy_metal, self.organic_matter):
+            universe = var.universe
+            kinks = [universe[1:-1][np.abs(np.diff(term.mf, 2)) > 1e-9] for term in var.terms.values()]
+            axis = np.concatenate([np.linspace(universe[0], universe[-1], points)] + kinks)
+            axes.append(np.unique(np.round(axis, 9)))
+        return axes
+
+    def build_control_surface(self, points=None, target_error=SURFACE_TOLERANCE, validation_samples=500, seed=0,
+                              workers=None):
+        """Sampling compute() di grid 4-D dan kembalikan ControlSurface
+        
+        Setiap sumbu berisi sejumlah titik merata ditambah titik patah fungsi
+        keanggotaannya, supaya interpolasi multilinear tidak memotong sudut kurva.
+        Galat terhadap compute() diukur pada `validation_samples` input acak.
+        Tanpa `points`, kerapatan dinaikkan menurut SURFACE_POINTS sampai galat
+        rata-rata tidak melebihi `target_error`; titik grid yang sudah dihitung
+        dipakai lagi. Jika target tidak tercapai, grid terapat dikembalikan
+        dengan peringatan. Pembangunan memanggil compute() sekali per titik grid
+        (belasan ribu untuk 6 titik), dibagi ke `workers` proses, jadi simpan
+        hasilnya dengan save() dan muat ulang.
+        """
+        variables = [self.ph, self.nutrition, self.heavy_metal, self.organic_matter]
+        rng = np.random.default_rng(seed)
+        samples = np.column_stack([rng.uniform(var.universe[0], var.universe[-1], validation_samples) for var in variables])
+        expected = self._compute_points(samples, workers)
+
+        known = {}
+        for count in ((points,) if points else SURFACE_POINTS):
+            axes = self._surface_axes(count)
+            grid = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(axes))
+            keys = list(map(tuple, grid.tolist()))
+            todo = [key for key in dict.fromkeys(keys) if key not in known]
+            if todo:
+                known.update(zip(todo, self._compute_points(np.array(todo), workers).tolist()))
+            surface = ControlSurface(axes, np.array([known[key] for key in keys]).reshape([len(axis) for axis in axes]))
+            errors = np.abs(surface.evaluate(*samples.T)[0] - expected)
+            surface.max_error, surface.mean_error = float(errors.max()), float(errors.mean())
+            if points or surface.mean_error <= target_error:
+                return surface
+        warnings.warn(f"Control surface {SURFACE_POINTS[-1]} titik per sumbu masih bergalat rata-rata "
+                      f"{surface.mean_error:.3f} > {target_error}")
+        return surface
+
+    def _membership_curves(self):
+        """Kurva (universe, μ, label) tiap variabel, diambil dari term skfuzzy yang sudah dihitung"""
+        variables = {'ph': self.ph, 'nutrition': self.nutrition, 'heavy_metal': self.heavy_metal,
+                     'organic_matter': self.organic_matter, 'quality': self.quality}
+        return {name: [(var.universe, term.mf, label.capitalize()) for label, term in var.terms.items()]
+                for name, var in variables.items()}
+
+    # Judul dan label sumbu x plot tiap variabel
+    plot_labels = {
+        'ph': ('pH Tanah (Asam: <6.0, Normal: 6.0-7.0, Basa: >7.0)', 'Nilai pH'),
+        'nutrition': ('Nutrisi (Rendah: <100, Sedang: 100-200, Tinggi: >200 mg/kg)', 'Nutrisi (mg/kg)'),
+        'heavy_metal': ('Logam Berat (Rendah: <10, Sedang: 10-20, Tinggi: >20 mg/kg)', 'Logam Berat (mg/kg)'),
+        'organic_matter': ('Bahan Organik (Rendah: <2, Sedang: 2-5, Tinggi: >5%)', 'Bahan Organik (%)'),
+        'quality': ('Kualitas Tanah (Buruk: 0-40, Sedang: 40-70, Baik: 70-100)', 'Skor Kualitas'),
+    }
+
+    def membership_figures(self, folder='output'):
+        """Spesifikasi gambar (lihat plotting.render) untuk plot fungsi keanggotaan dan ringkasannya"""
+        curves = self._membership_curves()
+        figures = [dict(path=f"{folder}/{name}_membership.png", dpi=300, figsize=(10, 6), panels=[dict(
+                       curves=curves[name], legend_kw=dict(fontsize=10),
+                       title=(title, dict(fontsize=14, fontweight='bold', pad=15)),
+                       xlabel=(xlabel, dict(fontsize=12)), ylabel=('Derajat Keanggotaan', dict(fontsize=12)))])
+                   for name, (title, xlabel) in self.plot_labels.items()]
+        figures.append(dict(
+            path=f"{folder}/all_membership_functions.png", dpi=300, figsize=(15, 10), layout=(2, 3),
+            suptitle=('Sistem Fuzzy Mamdani - Evaluasi Kualitas Tanah', dict(fontsize=16, fontweight='bold')),
+            panels=[dict(curves=curves[name], legend_kw=dict(fontsize=8),
+                         title=(title.split('(')[0].strip(), dict(fontsize=12, fontweight='bold')))
+                    for name, (title, _) in self.plot_labels.items()],
+            note=(5, 'Aturan Fuzzy:\n\n'
+                  + ''.join(f'{i + 1}. {RULE_BASE.describe(i, title=True)}\n' for i in range(len(RULES)))
+                  + '\nAgil Ghani Istikmal (5220411040)',
+                  dict(fontsize=10, bbox=dict(boxstyle="round,pad=0.5", facecolor="lightblue", alpha=0.7)))))
+        return figures
+
+    def plot_membership_functions(self, workers=None):
+        """Plot fungsi keanggotaan ke output/; gambar yang isinya tidak berubah dilewati"""
+        plotting.render_all(self.membership_figures(), workers)
+        print("Visualisasi fungsi keanggotaan berhasil dibuat")
+
+    # Fungsi utilitas untuk manual membership degree
+    def _interp_membership_degrees(self, ph, nutrition, heavy_metal, organic_matter):
+        """Derajat keanggotaan persis seperti yang dipakai compute(): interpolasi pada universe, input di luar universe dipotong ke batasnya"""
+        variables = {'ph': (self.ph, ph), 'nutrition': (self.nutrition, nutrition),
+                     'heavy_metal': (self.heavy_metal, heavy_metal), 'organic_matter': (self.organic_matter, organic_matter)}
         return {
-            'ph': ph_degrees,
-            'nutrition': nutrition_degrees,
-            'heavy_metal': heavy_metal_degrees,
-            'organic_matter': organic_matter_degrees
+            name: {label: fuzz.interp_membership(var.universe, term.mf, np.clip(value, var.universe[0], var.universe[-1]))
+                   for label, term in var.terms.items()}
+            for name, (var, value) in variables.items()
         }
 
-    def explain(self, ph, nutrition, heavy_metal, organic_matter):
-        """Tampilkan step-by-step perhitungan fuzzy untuk satu data input, termasuk detail perhitungan membership degree."""
+    def trace(self, ph, nutrition, heavy_metal, organic_matter):
+        """Jejak inferensi tanpa teks, untuk skalar atau array input dengan panjang sama
+
+        Hasilnya dict kolom datar: input, derajat keanggotaan ('ph_asam', ...),
+        firing strength tiap aturan ('rule_1', ...), α teragregasi
+        ('alpha_buruk', ...), 'score' dan 'category'. Untuk array setiap
+        kolom berupa array, jadi bisa langsung dijadikan DataFrame.
+
+        Derajat keanggotaan dihitung seperti di compute(): interpolasi pada
+        universe, input di luar universe dipotong ke batasnya. Pada mode
+        'analytic' skor dihitung dari α jejak ini sendiri; pada mode
+        'discrete' (dan dengan control surface) skor berasal dari evaluate().
+        """
+        from_alphas = self.defuzzification == 'analytic' and self.control_surface is None
+        if np.ndim(ph) == 0:
+            md = self._interp_membership_degrees(ph, nutrition, heavy_metal, organic_matter)
+            strengths = RULE_BASE.firing_strengths_single(RULE_BASE.flatten(md))
+            alphas = RULE_BASE.aggregate_single(strengths)
+            if from_alphas:
+                score = self.centroid.single(alphas)
+                category = "Buruk" if score < 40 else "Sedang" if score < 70 else "Baik"
+            else:
+                score, category = self.evaluate(ph, nutrition, heavy_metal, organic_matter)
+            return self._trace_columns((ph, nutrition, heavy_metal, organic_matter), md, strengths, alphas,
+                                       score, category)
+        inputs = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (ph, nutrition, heavy_metal, organic_matter)))
+        md = self._interp_membership_degrees(*inputs)
+        strengths = RULE_BASE.firing_strengths(np.column_stack(RULE_BASE.flatten(md)))
+        alphas = RULE_BASE.aggregate(strengths)
+
+        if from_alphas:
+            scores = self.centroid(alphas)
+            categories = np.where(scores < 40, "Buruk", np.where(scores < 70, "Sedang", "Baik"))
+        elif self.control_surface is not None:
+            scores, categories = self.control_surface.evaluate(*inputs)
+        else:
+            # Baris input yang sama dihitung sekali
+            rows, index = np.unique(np.column_stack(inputs), axis=0, return_inverse=True)
+            results = [self.evaluate(*row) for row in rows.tolist()]
+            scores = np.array([score for score, _ in results])[index.ravel()]
+            categories = np.array([category for _, category in results])[index.ravel()]
+        return self._trace_columns(inputs, md, strengths.T, alphas.T, scores, categories)
+
+    @staticmethod
+    def _trace_columns(inputs, md, strengths, alphas, score, category):
+        columns = dict(zip(('ph', 'nutrition', 'heavy_metal', 'organic_matter'), inputs))
+        columns.update((f"{var}_{term}", md[var][term]) for var, term in RULE_BASE.columns)
+        columns.update((f"rule_{i + 1}", strength) for i, strength in enumerate(strengths))
+        columns.update((f"alpha_{term}", alpha) for term, alpha in zip(RULE_BASE.output_terms, alphas))
+        columns.update(score=score, category=category)
+        return columns
+
+    def explain(self, ph, nutrition, heavy_metal, organic_matter, verbose=True):
+        """Tampilkan step-by-step perhitungan fuzzy untuk satu data input, termasuk detail perhitungan membership degree.
+
+        Mengembalikan jejak yang sama dengan trace(); dengan verbose=False tidak ada yang dicetak.
+        Semua angka yang dicetak (derajat, α, skor) diambil dari jejak itu.
+        """
+        trace = self.trace(ph, nutrition, heavy_metal, organic_matter)
+        if not verbose:
+            return trace
         from tabulate import tabulate
+        # Rumus dijelaskan pada nilai yang dipakai compute(): input di luar universe dipotong ke batasnya
+        values = {}
+        for name, var, value in (('ph', self.ph, ph), ('nutrition', self.nutrition, nutrition),
+                                 ('heavy_metal', self.heavy_metal, heavy_metal),
+                                 ('organic_matter', self.organic_matter, organic_matter)):
+            values[name] = float(np.clip(value, var.universe[0], var.universe[-1]))
         print("\n:: DETAIL FUZZIFIKASI")
+        for name, label in (('ph', 'pH'), ('nutrition', 'Nutrisi'), ('heavy_metal', 'Logam Berat'),
+                            ('organic_matter', 'Bahan Organik')):
+            if values[name] != trace[name]:
+                print(f"  {label} {trace[name]} di luar universe, dipotong menjadi {values[name]} seperti compute()")
         print("[PH]")
-        ph_asam = self._explain_trapmf(ph, [4, 4, 5.5, 6.0], 'Asam')
-        ph_normal = self._explain_trimf(ph, [5.5, 6.5, 7.5], 'Normal')
-        ph_basa = self._explain_trapmf(ph, [6.5, 7.0, 9, 9], 'Basa')
+        self._explain_trapmf(values['ph'], [4, 4, 5.5, 6.0], 'Asam')
+        self._explain_trimf(values['ph'], [5.5, 6.5, 7.5], 'Normal')
+        self._explain_trapmf(values['ph'], [6.5, 7.0, 9, 9], 'Basa')
         print("\n[NUTRISI]")
-        nut_rendah = self._explain_trimf(nutrition, [0, 0, 150], 'Rendah')
-        nut_sedang = self._explain_trimf(nutrition, [50, 150, 250], 'Sedang')
-        nut_tinggi = self._explain_trimf(nutrition, [150, 350, 350], 'Tinggi')
+        self._explain_trimf(values['nutrition'], [0, 0, 150], 'Rendah')
+        self._explain_trimf(values['nutrition'], [50, 150, 250], 'Sedang')
+        self._explain_trimf(values['nutrition'], [150, 350, 350], 'Tinggi')
         print("\n[LOGAM BERAT]")
-        metal_rendah = self._explain_trimf(heavy_metal, [0, 0, 15], 'Rendah')
-        metal_sedang = self._explain_trimf(heavy_metal, [5, 15, 25], 'Sedang')
-        metal_tinggi = self._explain_trimf(heavy_metal, [15, 30, 30], 'Tinggi')
+        self._explain_trimf(values['heavy_metal'], [0, 0, 15], 'Rendah')
+        self._explain_trimf(values['heavy_metal'], [5, 15, 25], 'Sedang')
+        self._explain_trimf(values['heavy_metal'], [15, 30, 30], 'Tinggi')
         print("\n[BAHAN ORGANIK]")
-        org_rendah = self._explain_trimf(organic_matter, [0, 0, 3], 'Rendah')
-        org_sedang = self._explain_trimf(organic_matter, [1, 3.5, 6], 'Sedang')
-        org_tinggi = self._explain_trimf(organic_matter, [4, 10, 10], 'Tinggi')
-        # Tabel ringkasan
-        md = {
-            'ph': {'asam': ph_asam, 'normal': ph_normal, 'basa': ph_basa},
-            'nutrition': {'rendah': nut_rendah, 'sedang': nut_sedang, 'tinggi': nut_tinggi},
-            'heavy_metal': {'rendah': metal_rendah, 'sedang': metal_sedang, 'tinggi': metal_tinggi},
-            'organic_matter': {'rendah': org_rendah, 'sedang': org_sedang, 'tinggi': org_tinggi}
-        }
-        table = [
-            ["pH", ph, md['ph']['asam'], md['ph']['normal'], md['ph']['basa']],
-            ["Nutrisi", nutrition, md['nutrition']['rendah'], md['nutrition']['sedang'], md['nutrition']['tinggi']],
-            ["Logam Berat", heavy_metal, md['heavy_metal']['rendah'], md['heavy_metal']['sedang'], md['heavy_metal']['tinggi']],
-            ["Bahan Organik", organic_matter, md['organic_matter']['rendah'], md['organic_matter']['sedang'], md['organic_matter']['tinggi']]
-        ]
-        print("\nRingkasan Derajat Keanggotaan:")
+        self._explain_trimf(values['organic_matter'], [0, 0, 3], 'Rendah')
+        self._explain_trimf(values['organic_matter'], [1, 3.5, 6], 'Sedang')
+        self._explain_trimf(values['organic_matter'], [4, 10, 10], 'Tinggi')
+        # Tabel ringkasan: derajat dari jejak, yaitu interpolasi pada universe yang dipakai compute()
+        table = [[label, trace[name], *(trace[f"{name}_{term}"] for term in terms)]
+                 for name, label, terms in (('ph', 'pH', ('asam', 'normal', 'basa')),
+                                            ('nutrition', 'Nutrisi', ('rendah', 'sedang', 'tinggi')),
+                                            ('heavy_metal', 'Logam Berat', ('rendah', 'sedang', 'tinggi')),
+                                            ('organic_matter', 'Bahan Organik', ('rendah', 'sedang', 'tinggi')))]
+        print("\nRingkasan Derajat Keanggotaan (interpolasi pada universe, seperti compute()):")
         print(tabulate(table, headers=["Variabel", "Nilai", "Rendah/Asam", "Sedang/Normal", "Tinggi/Basa"], floatfmt=".3f", tablefmt="rounded_grid"))
         # 2. Firing strength rules
-        rules = []
-        # Aturan 1
-        r1 = min(md['ph']['normal'], md['nutrition']['tinggi'], md['heavy_metal']['rendah'])
-        rules.append(("pH normal ∧ nutrisi tinggi ∧ logam rendah → Baik", r1, "Baik"))
-        # Aturan 2
-        r2 = min(max(md['ph']['asam'], md['ph']['basa']), md['nutrition']['rendah'], md['heavy_metal']['tinggi'])
-        rules.append(("(pH asam ∨ basa) ∧ nutrisi rendah ∧ logam tinggi → Buruk", r2, "Buruk"))
-        # Aturan 3
-        r3 = min(md['ph']['normal'], md['nutrition']['sedang'], md['heavy_metal']['sedang'])
-        rules.append(("pH normal ∧ nutrisi sedang ∧ logam sedang → Sedang", r3, "Sedang"))
-        # Aturan 4
-        r4 = md['organic_matter']['tinggi']
-        rules.append(("bahan organik tinggi → Baik", r4, "Baik"))
-        # Aturan 5
-        r5 = min(md['organic_matter']['rendah'], md['heavy_metal']['tinggi'])
-        rules.append(("bahan organik rendah ∧ logam tinggi → Buruk", r5, "Buruk"))
-        # Aturan 6
-        r6 = min(md['ph']['normal'], md['nutrition']['tinggi'], md['heavy_metal']['sedang'])
-        rules.append(("pH normal ∧ nutrisi tinggi ∧ logam sedang → Sedang", r6, "Sedang"))
+        strengths = [trace[f"rule_{i + 1}"] for i in range(len(RULES))]
+        alphas = [trace[f"alpha_{term}"] for term in RULE_BASE.output_terms]
+        rules = [(RULE_BASE.describe(i), alpha, out.capitalize()) for i, (alpha, (_, out)) in enumerate(zip(strengths, RULES))]
         print("\nFiring Strength (α) Setiap Aturan:")
         rule_table = [[i+1, desc, f"{alpha:.3f}", out] for i, (desc, alpha, out) in enumerate(rules)]
         print(tabulate(rule_table, headers=["No", "Rule", "α", "Output"], tablefmt="rounded_grid"))
         # 3. Agregasi
-        a_buruk = max(rules[1][1], rules[4][1])
-        a_sedang = max(rules[2][1], rules[5][1])
-        a_baik = max(rules[0][1], rules[3][1])
         print(f"\nAgregasi α:")
-        print(f"  α_buruk  = max({rules[1][1]:.3f}, {rules[4][1]:.3f}) = {a_buruk:.3f}")
-        print(f"  α_sedang = max({rules[2][1]:.3f}, {rules[5][1]:.3f}) = {a_sedang:.3f}")
-        print(f"  α_baik   = max({rules[0][1]:.3f}, {rules[3][1]:.3f}) = {a_baik:.3f}")
+        for term, alpha in zip(RULE_BASE.output_terms, alphas):
+            inputs = ', '.join(f"{s:.3f}" for s, (_, out) in zip(strengths, RULES) if out == term)
+            print(f"  α_{term:<6} = max({inputs}) = {alpha:.3f}")
         # 4. Tampilkan rumus defuzzifikasi saja (tanpa perhitungan manual)
         print(f"\nDefuzzifikasi (Metode Centroid):")
         print(f"  Skor akhir = (α_buruk × z_buruk + α_sedang × z_sedang + α_baik × z_baik) / (α_buruk + α_sedang + α_baik)")
-        # 5. Defuzzifikasi (pakai library agar konsisten)
-        score, category = self.evaluate(ph, nutrition, heavy_metal, organic_matter)
-        print(f"\nDefuzzifikasi (skor akhir dari library): {score:.2f}")
-        print(f"Kategori: {category}\n")
+        # 5. Skor dari jejak yang sama
+        source = ("control surface" if self.control_surface is not None
+                  else "centroid analitik α" if self.defuzzification == 'analytic' else "library")
+        print(f"\nDefuzzifikasi (skor akhir dari {source}): {trace['score']:.2f}")
+        print(f"Kategori: {trace['category']}\n")
+        return trace
 
     def _explain_trimf(self, x, params, label):
         a, b, c = params
         print(f"  - {label} (triangular [{a}, {b}, {c}]):")
         print(f"    x = {x}")
-        if x <= a or x >= c:
+        # Puncak dicek lebih dulu agar bahu ([0, 0, 150] di x = 0) bernilai 1 seperti fuzz.trimf
+        if x == b:
+            print(f"    Karena x == {b}, maka μ = 1.0")
+            return 1.0
+        elif x <= a or x >= c:
             print(f"    Karena x <= {a} atau x >= {c}, maka μ = 0.0")
             return 0.0
         elif a < x < b:
             val = (x - a) / (b - a)
             print(f"    Karena {a} < x < {b}, maka μ = (x - {a}) / ({b} - {a}) = ({x} - {a}) / {b - a} = {val:.3f}")
             return val
-        elif b <= x < c:
+        elif b < x < c:
             val = (c - x) / (c - b)
-            print(f"    Karena {b} <= x < {c}, maka μ = ({c} - x) / ({c} - {b}) = ({c} - {x}) / {c - b} = {val:.3f}")
+            print(f"    Karena {b} < x < {c}, maka μ = ({c} - x) / ({c} - {b}) = ({c} - {x}) / {c - b} = {val:.3f}")
             return val
-        elif x == b:
-            print(f"    Karena x == {b}, maka μ = 1.0")
-            return 1.0
         print(f"    (Tidak terdefinisi, μ = 0.0)")
         return 0.0
 
@@ -311,16 +497,16 @@ class FuzzySoilQuality:
         a, b, c, d = params
         print(f"  - {label} (trapezoid [{a}, {b}, {c}, {d}]):")
         print(f"    x = {x}")
-        if x <= a or x >= d:
+        if b <= x <= c:
+            print(f"    Karena {b} <= x <= {c}, maka μ = 1.0")
+            return 1.0
+        elif x <= a or x >= d:
             print(f"    Karena x <= {a} atau x >= {d}, maka μ = 0.0")
             return 0.0
         elif a < x < b:
             val = (x - a) / (b - a)
             print(f"    Karena {a} < x < {b}, maka μ = (x - {a}) / ({b} - {a}) = ({x} - {a}) / {b - a} = {val:.3f}")
             return val
-        elif b <= x <= c:
-            print(f"    Karena {b} <= x <= {c}, maka μ = 1.0")
-            return 1.0
         elif c < x < d:
             val = (d - x) / (d - c)
             print(f"    Karena {c} < x < {d}, maka μ = ({d} - x) / ({d} - {c}) = ({d} - {x}) / {d - c} = {val:.3f}")
@@ -328,39 +514,105 @@ class FuzzySoilQuality:
         print(f"    (Tidak terdefinisi, μ = 0.0)")
         return 0.0
 
-    def plot_input_membership_for_data(self, no, ph, nutrition, heavy_metal, organic_matter):
+    def input_figures(self, no, ph, nutrition, heavy_metal, organic_matter):
+        """Spesifikasi gambar fungsi keanggotaan dengan garis vertikal pada nilai input, di output/{no}/"""
+        curves = self._membership_curves()
+        values = {'ph': ph, 'nutrition': nutrition, 'heavy_metal': heavy_metal,
+                  'organic_matter': organic_matter, 'quality': None}
+        return [dict(path=f"output/{no}/{name}.png", dpi=200, figsize=(8, 5), panels=[dict(
+                    curves=curves[name], legend_kw=dict(fontsize=9),
+                    # Garis vertikal pada nilai input (kecuali quality)
+                    vline=None if values[name] is None else
+                          (values[name], dict(color='red', linestyle='--', label=f"Input: {values[name]}")),
+                    title=(title.split('(')[0].strip(), dict(fontsize=13, fontweight='bold')),
+                    xlabel=(xlabel, {}), ylabel=('Derajat Keanggotaan', {}))])
+                for name, (title, xlabel) in self.plot_labels.items()]
+
+    def plot_input_membership_for_data(self, no, ph, nutrition, heavy_metal, organic_matter, workers=1):
         """Plot membership function tiap variabel dengan garis vertikal pada nilai input, simpan ke output/{no}/"""
-        import matplotlib.pyplot as plt
-        import os
-        # Siapkan folder
-        folder = f"output/{no}"
-        if not os.path.exists(folder):
-            os.makedirs(folder)
-        # Daftar parameter
-        mf_params = [
-            dict(var=self.ph, mfs=[(fuzz.trapmf, [4, 4, 5.5, 6.0], 'Asam'), (fuzz.trimf, [5.5, 6.5, 7.5], 'Normal'), (fuzz.trapmf, [6.5, 7.0, 9, 9], 'Basa')], title='pH Tanah', xlabel='Nilai pH', filename='ph', value=ph),
-            dict(var=self.nutrition, mfs=[(fuzz.trimf, [0, 0, 150], 'Rendah'), (fuzz.trimf, [50, 150, 250], 'Sedang'), (fuzz.trimf, [150, 350, 350], 'Tinggi')], title='Nutrisi', xlabel='Nutrisi (mg/kg)', filename='nutrition', value=nutrition),
-            dict(var=self.heavy_metal, mfs=[(fuzz.trimf, [0, 0, 15], 'Rendah'), (fuzz.trimf, [5, 15, 25], 'Sedang'), (fuzz.trimf, [15, 30, 30], 'Tinggi')], title='Logam Berat', xlabel='Logam Berat (mg/kg)', filename='heavy_metal', value=heavy_metal),
-            dict(var=self.organic_matter, mfs=[(fuzz.trimf, [0, 0, 3], 'Rendah'), (fuzz.trimf, [1, 3.5, 6], 'Sedang'), (fuzz.trimf, [4, 10, 10], 'Tinggi')], title='Bahan Organik', xlabel='Bahan Organik (%)', filename='organic_matter', value=organic_matter),
-            dict(var=self.quality, mfs=[(fuzz.trimf, [0, 0, 50], 'Buruk'), (fuzz.trimf, [20, 50, 80], 'Sedang'), (fuzz.trimf, [50, 100, 100], 'Baik')], title='Kualitas Tanah', xlabel='Skor Kualitas', filename='quality', value=None)
-        ]
-        for p in mf_params:
-            fig, ax = plt.subplots(figsize=(8, 5))
-            for func, params, label in p['mfs']:
-                ax.plot(p['var'].universe, func(p['var'].universe, params), label=label)
-            # Garis vertikal pada nilai input (kecuali quality)
-            if p['value'] is not None:
-                ax.axvline(p['value'], color='red', linestyle='--', label=f"Input: {p['value']}")
-            ax.set_title(p['title'], fontsize=13, fontweight='bold')
-            ax.set_xlabel(p['xlabel'])
-            ax.set_ylabel('Derajat Keanggotaan')
-            ax.grid(True, alpha=0.3)
-            ax.legend(fontsize=9)
-            plt.tight_layout()
-            plt.savefig(f"{folder}/{p['filename']}.png", dpi=200, bbox_inches='tight')
-            plt.close()
+        plotting.render_all(self.input_figures(no, ph, nutrition, heavy_metal, organic_matter), workers)
+
+class ControlSurface:
+    """Skor sistem skfuzzy yang sudah disampling di grid 4-D
+    
+    Query dijawab dengan interpolasi multilinear, vektor penuh dan tanpa state
+    bersama, jadi bisa dipanggil dengan array besar dan dari banyak thread.
+    max_error/mean_error adalah galat absolut terhadap compute() saat dibangun.
+    """
+    def __init__(self, axes, scores, max_error=None, mean_error=None):
+        self.axes = [np.asarray(axis, dtype=float) for axis in axes]
+        self.scores = np.asarray(scores, dtype=float)
+        self.max_error = max_error
+        self.mean_error = mean_error
+        from scipy.interpolate import RegularGridInterpolator
+        self._interpolator = RegularGridInterpolator(self.axes, self.scores)
+
+    def evaluate(self, ph, nutrition, heavy_metal, organic_matter):
+        """Skor dan kategori untuk array input; input di luar grid dipotong ke batasnya seperti compute()"""
+        points = np.column_stack([np.clip(np.asarray(values, dtype=float).ravel(), axis[0], axis[-1])
+                                  for values, axis in zip((ph, nutrition, heavy_metal, organic_matter), self.axes)])
+        scores = self._interpolator(points)
+        categories = np.where(scores < 40, "Buruk", np.where(scores < 70, "Sedang", "Baik"))
+        return scores, categories
+
+    def check(self, tolerance=SURFACE_TOLERANCE):
+        """ValueError jika galat rata-rata tersimpan melebihi `tolerance`; peringatan jika galatnya tidak diketahui"""
+        if self.mean_error is None:
+            warnings.warn("Galat control surface tidak diketahui; bangun ulang dengan build_control_surface()")
+        elif self.mean_error > tolerance:
+            raise ValueError(f"Galat rata-rata control surface {self.mean_error:.3f} melebihi toleransi {tolerance}; "
+                             f"bangun ulang dengan target galat yang lebih kecil")
+
+    def save(self, path):
+        """Simpan ke file .npz"""
+        np.savez(path, scores=self.scores, max_error=np.nan if self.max_error is None else self.max_error,
+                 mean_error=np.nan if self.mean_error is None else self.mean_error,
+                 **{f'axis{i}': axis for i, axis in enumerate(self.axes)})
+
+    @classmethod
+    def load(cls, path, tolerance=None):
+        """Muat ControlSurface dari file .npz hasil save(); dengan `tolerance` diperiksa dengan check()"""
+        with np.load(path) as data:
+            axes = [data[f'axis{i}'] for i in range(data['scores'].ndim)]
+            errors = [None if np.isnan(data[key]) else float(data[key]) for key in ('max_error', 'mean_error')]
+            surface = cls(axes, data['scores'], *errors)
+        if tolerance is not None:
+            surface.check(tolerance)
+        return surface
 
 def main():
+    # Hanya dibutuhkan oleh CLI; impor untuk scoring saja tidak memuatnya
+    import argparse
+    import pandas as pd
+    from tabulate import tabulate
+    parser = argparse.ArgumentParser(description="Evaluasi kualitas tanah dengan sistem fuzzy Mamdani (skfuzzy)")
+    parser.add_argument('--no-row-plots', action='store_true',
+                        help="jangan buat plot per baris data di output/{No}/")
+    parser.add_argument('--plot-workers', type=int, default=None,
+                        help="jumlah proses untuk membuat plot (default: jumlah CPU)")
+    parser.add_argument('--quiet', action='store_true',
+                        help="jangan cetak step-by-step per baris; jejak dihitung sekaligus untuk semua baris")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="simpan jejak inferensi semua baris sebagai tabel kolom (.csv atau .parquet)")
+    parser.add_argument('--build-surface', metavar='FILE',
+                        help="bangun control surface, simpan ke FILE (.npz) lalu selesai")
+    parser.add_argument('--surface-target', type=float, default=SURFACE_TOLERANCE,
+                        help="galat rata-rata maksimum control surface terhadap compute()")
+    parser.add_argument('--surface-points', type=int, default=None,
+                        help="titik merata per sumbu (default: sekecil mungkin untuk --surface-target)")
+    parser.add_argument('--workers', type=int, default=None, help="jumlah proses untuk membangun control surface")
+    args = parser.parse_args()
+    
+    if args.build_surface:
+        surface = FuzzySoilQuality().build_control_surface(args.surface_points, args.surface_target,
+                                                           workers=args.workers)
+        surface.save(args.build_surface)
+        print(f"Control surface tersimpan di {args.build_surface}: "
+              f"{' x '.join(str(len(axis)) for axis in surface.axes)} titik grid")
+        print(f"Galat terhadap compute(): maksimum {surface.max_error:.3f}, rata-rata {surface.mean_error:.3f} "
+              f"(target rata-rata {args.surface_target})")
+        return
+    
     print()
     print("SISTEM FUZZY MAMDANI - EVALUASI KUALITAS TANAH")
     print()
@@ -369,32 +621,44 @@ def main():
     system = FuzzySoilQuality()
     
     # Tampilkan fungsi keanggotaan
-    system.plot_membership_functions()
+    system.plot_membership_functions(workers=args.plot_workers)
     
     # Baca dan proses data
     try:
         df = pd.read_csv('data.csv')
         
-        # Tampilkan step-by-step untuk semua data
+        # Tampilkan step-by-step untuk semua data; jejaknya dipakai lagi untuk tabel hasil
+        figures = []
+        if args.quiet:
+            traces = system.trace(df['pH'], df['Nutrisi'], df['Logam_Berat'], df['Bahan_Organik'])
+        else:
+            traces = []
         for idx, row in df.iterrows():
-            print(f"\n:: STEP-BY-STEP PERHITUNGAN DATA {row['No']}")
-            system.explain(row['pH'], row['Nutrisi'], row['Logam_Berat'], row['Bahan_Organik'])
-            # Plot membership function untuk data ini
-            system.plot_input_membership_for_data(
-                row['No'], row['pH'], row['Nutrisi'], row['Logam_Berat'], row['Bahan_Organik']
-            )
+            if not args.quiet:
+                print(f"\n:: STEP-BY-STEP PERHITUNGAN DATA {row['No']}")
+                traces.append(system.explain(row['pH'], row['Nutrisi'], row['Logam_Berat'], row['Bahan_Organik']))
+            # Plot membership function untuk data ini, dibuat sekaligus setelah loop
+            if not args.no_row_plots:
+                figures += system.input_figures(
+                    row['No'], row['pH'], row['Nutrisi'], row['Logam_Berat'], row['Bahan_Organik']
+                )
+        plotting.render_all(figures, args.plot_workers)
+        traces = pd.DataFrame(traces)
+        traces.insert(0, 'No', df['No'].to_numpy())
+        if args.trace:
+            if args.trace.endswith('.parquet'):
+                traces.to_parquet(args.trace, index=False)
+            else:
+                traces.to_csv(args.trace, index=False)
         
         # Siapkan data untuk tabel
         table_data = []
         headers = ["No", "pH", "Nutrisi", "Logam Berat", "Bahan Organik", "Skor", "Kualitas"]
         
-        for index, row in df.iterrows():
-            # Ambil data
+        for (index, row), score, category in zip(df.iterrows(), traces['score'], traces['category']):
+            # Ambil data; skor dan kategori sudah ada di jejak
             ph, nutrition, heavy_metal, organic_matter = row['pH'], row['Nutrisi'], row['Logam_Berat'], row['Bahan_Organik']
             
-            # Evaluasi
-            score, category = system.evaluate(ph, nutrition, heavy_metal, organic_matter)
-            
             # Tambahkan ke data tabel
             table_data.append([
                 row['No'],